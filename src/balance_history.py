@@ -0,0 +1,79 @@
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional, Union
+
+from fx_rates import FxTable
+from tricount_read import read_entries
+
+When = Union[str, date, datetime]
+
+
+def _as_datetime(when: When) -> datetime:
+    # 日付だけならその日の終わりまで含める
+    if isinstance(when, datetime):
+        return when
+    if isinstance(when, date):
+        return datetime.combine(when, time.max)
+    if len(when) == 10:
+        return datetime.combine(date.fromisoformat(when), time.max)
+    return datetime.fromisoformat(when)
+
+
+class BalanceHistory:
+    """
+    Date-sorted prefix sums of paid and share per member over the registry
+    entries. Row k holds the totals of the first k entries, so a point-in-time
+    balance is one bisect plus one row read: O(members + log entries).
+    Amounts are in `currency` (the registry's own by default), converted
+    with the rate table `fx` where entries differ.
+    """
+
+    def __init__(
+        self, data: Any, currency: Optional[str] = None, fx: Optional[FxTable] = None
+    ) -> None:
+        rows, self.names = read_entries(data, currency, fx)
+        # 日付のないエントリは最初から有効とみなす
+        rows.sort(key=lambda r: _as_datetime(r[0]) if r[0] else datetime.min)
+
+        self.members: List[int] = list(self.names)
+        col = {mid: j for j, mid in enumerate(self.members)}
+        m = len(self.members)
+
+        self.dates: List[datetime] = []
+        self.paid = array("d", bytes(8 * m))
+        self.share = array("d", bytes(8 * m))
+        for d, deltas in rows:
+            self.dates.append(_as_datetime(d) if d else datetime.min)
+            base = len(self.paid) - m
+            self.paid.extend(self.paid[base : base + m])
+            self.share.extend(self.share[base : base + m])
+            for mid, p, sh in deltas:
+                self.paid[base + m + col[mid]] += p
+                self.share[base + m + col[mid]] += sh
+
+    def _row(self, when: When) -> int:
+        return bisect_right(self.dates, _as_datetime(when)) * len(self.members)
+
+    def _net(self, base: int) -> List[float]:
+        m = len(self.members)
+        return [self.paid[base + j] - self.share[base + j] for j in range(m)]
+
+    def balance_at(self, when: When) -> Dict[int, float]:
+        """
+        Net balance per membership id counting every entry dated on or before
+        `when` (a date means the whole day).
+        """
+        net = self._net(self._row(when))
+        return {mid: round(b, 3) for mid, b in zip(self.members, net)}
+
+    def change_between(self, start: When, end: When) -> Dict[int, float]:
+        """
+        Net change per membership id from entries after `start` up to and
+        including `end`.
+        """
+        before = self._net(self._row(start))
+        after = self._net(self._row(end))
+        return {
+            mid: round(a - b, 3) for mid, a, b in zip(self.members, after, before)
+        }
@@ -0,0 +1,327 @@
+import copy
+import heapq
+import json
+import math
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from graph_reduction import WArc
+from optimal_settlement import (
+    AMOUNT_RESOLUTION,
+    AnytimeResult,
+    Arc,
+    Channel,
+    Person,
+    PlanKey,
+    arc_cost_vectors,
+    lex_scales,
+    mk_arcs,
+    settle_arcs,
+)
+
+
+class _Network:
+    """
+    Residual network over the compiled arcs, built once per cost bucket. Arc
+    j is edge 2j (reverse 2j + 1); every node also has a source and a sink
+    edge, so a solve only resets the capacities and sets those on S and T.
+    Nodes without a balance in the solve are never entered, so, as in
+    optimal_settle, only the people being settled relay money.
+    """
+
+    def __init__(
+        self, n_nodes: int, tails: Sequence[int], heads: Sequence[int], costs: List
+    ) -> None:
+        n, m = n_nodes, len(tails)
+        self.n, self.m = n, m
+        self.S, self.T = n, n + 1
+        self.to: List[int] = []
+        self.cost: List = []
+        self.adj: List[List[int]] = [[] for _ in range(n + 2)]
+
+        def add(u: int, v: int, c) -> None:
+            self.adj[u].append(len(self.to))
+            self.to.append(v)
+            self.cost.append(c)
+            self.adj[v].append(len(self.to))
+            self.to.append(u)
+            self.cost.append(-c)
+
+        for j in range(m):
+            add(tails[j], heads[j], costs[j])
+        for v in range(n):
+            add(self.S, v, 0)  # 2m + 4v
+            add(v, self.T, 0)  # 2m + 4v + 2
+        self.base_cap = [1e18, 0.0] * m + [0.0] * (4 * n)
+
+    def solve(self, balances: Dict[int, float]) -> Tuple[Dict[int, float], float]:
+        # 逐次最短路 (MCMF.min_cost_flow と同じ手順、グラフは使い回し)
+        n, m, S, T = self.n, self.m, self.S, self.T
+        to, cost, adj = self.to, self.cost, self.adj
+        cap = self.base_cap[:]
+        # balances にいない人 (設定にだけいる人) は経由しない
+        active = bytearray(n + 2)
+        active[S] = active[T] = 1
+        max_f = 0.0
+        for v, b in balances.items():
+            if v < n:
+                active[v] = 1
+            if v >= n:
+                # どのチャネルにもいない人
+                if abs(b) > 1e-9:
+                    raise RuntimeError("No feasible path")
+            elif b < -1e-9:
+                cap[2 * m + 4 * v] = -b
+                max_f -= b
+            elif b > 1e-9:
+                cap[2 * m + 4 * v + 2] = b
+
+        N = n + 2
+        INF = float("inf")
+        h = [0] * N
+        total = 0.0
+        flow = 0.0
+        while flow + 1e-12 < max_f:
+            dist = [INF] * N
+            prev_e = [-1] * N
+            dist[S] = 0
+            pq = [(0, S)]
+            while pq:
+                d, v = heapq.heappop(pq)
+                if d > dist[v]:
+                    continue
+                if v == T:
+                    break
+                hv = h[v]
+                for e in adj[v]:
+                    w = to[e]
+                    if cap[e] <= 1e-12 or not active[w]:
+                        continue
+                    nd = d + cost[e] + hv - h[w]
+                    if nd < dist[w]:
+                        dist[w] = nd
+                        prev_e[w] = e
+                        heapq.heappush(pq, (nd, w))
+
+            if dist[T] == INF:
+                if max_f - flow <= 1e-6:  # 浮動小数の端数
+                    break
+                raise RuntimeError("No feasible path")
+            # T で打ち切ったので、未確定のノードは dist[T] で止める
+            dt = dist[T]
+            for v in range(N):
+                h[v] += dist[v] if dist[v] < dt else dt
+
+            add_f = max_f - flow
+            v = T
+            while v != S:
+                e = prev_e[v]
+                add_f = min(add_f, cap[e])
+                v = to[e ^ 1]
+            v = T
+            while v != S:
+                e = prev_e[v]
+                cap[e] -= add_f
+                cap[e ^ 1] += add_f
+                v = to[e ^ 1]
+            flow += add_f
+            total += add_f * (h[T] - h[S])
+
+        if abs(flow - max_f) > 1e-6:
+            raise RuntimeError("Could not send all flow")
+        # 逆辺の残余容量 = その辺を流れた量
+        flows = {j: cap[2 * j + 1] for j in range(m) if cap[2 * j + 1] > 1e-8}
+        return flows, total
+
+
+class ChannelTopology:
+    """
+    Channel graph compiled once and reused across many settlements. Names are
+    interned to dense integer ids and the arc arrays are built up front, so a
+    solve only has to map its balances onto ids.
+    """
+
+    def __init__(
+        self,
+        channels: Dict[Channel, List[Arc]],
+        objective: Sequence[str] = ("hops",),
+        channel_costs: Optional[Dict[Channel, Dict[str, int]]] = None,
+        pair_costs: Optional[Dict[PlanKey, Dict[str, int]]] = None,
+    ) -> None:
+        self.names: List[Person] = []
+        self.ids: Dict[Person, int] = {}
+
+        # 無向→両向き (チャネルの順番が同コスト時の優先順)
+        self.keys: List[PlanKey] = []
+        for channel, pairs in channels.items():
+            self.keys.extend(mk_arcs(pairs, channel))
+        for _, u, v in self.keys:
+            for name in (u, v):
+                if name not in self.ids:
+                    self.ids[name] = len(self.names)
+                    self.names.append(name)
+
+        self.n_nodes = len(self.names)
+        self.tails = array("q", (self.ids[u] for _, u, _ in self.keys))
+        self.heads = array("q", (self.ids[v] for _, _, v in self.keys))
+
+        self.objective = tuple(objective)
+        self.vectors = None
+        if self.objective != ("hops",) or channel_costs or pair_costs:
+            costs = arc_cost_vectors(
+                self.keys, self.objective, channel_costs, pair_costs
+            )
+            self.vectors = [costs[k] for k in self.keys]
+        self._arcs: Dict[int, List[WArc]] = {}
+        self._nets: Dict[int, _Network] = {}
+
+    @classmethod
+    def from_arrays(
+        cls,
+        n_nodes: int,
+        tails: Sequence[int],
+        heads: Sequence[int],
+        vectors: Optional[Sequence[Sequence[int]]] = None,
+    ) -> "ChannelTopology":
+        """
+        Solver-only topology over existing id arrays (e.g. views of shared
+        memory); names and keys are not available, so use solve_ids().
+        """
+        topo = cls({})
+        topo.n_nodes = n_nodes
+        topo.tails, topo.heads, topo.vectors = tails, heads, vectors
+        return topo
+
+    @classmethod
+    def from_file(
+        cls, path: str, resolve: Optional[Callable[[str], Person]] = None
+    ) -> "ChannelTopology":
+        """
+        Loads a JSON config like
+        {"channels": {"zelle": [["Matt", "Hibiki"]], "venmo": [...]},
+         "objective": ["hops", "fee"], "channel_costs": {"venmo": {"fee": 3}},
+         "pair_costs": [["venmo", "Matt", "Guillermo", {"fee": 0}]]}
+        `resolve` maps every config entry (a name, or an integer membership
+        id) to the key used in the balances.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        resolve = resolve or (lambda name: name)
+
+        channels = {
+            ch: [(resolve(a), resolve(b)) for a, b in pairs]
+            for ch, pairs in cfg["channels"].items()
+        }
+        pair_costs = {
+            (ch, resolve(a), resolve(b)): weights
+            for ch, a, b, weights in cfg.get("pair_costs", [])
+        }
+        return cls(
+            channels,
+            objective=cfg.get("objective", ["hops"]),
+            channel_costs=cfg.get("channel_costs"),
+            pair_costs=pair_costs,
+        )
+
+    def relabel(self, mapping: Dict[Person, Person]) -> "ChannelTopology":
+        """
+        The same compiled graph with its names replaced through `mapping`
+        (names not in it are kept). The arrays and cached networks are shared,
+        so relabelling per registry costs one pass over the arcs.
+        """
+        topo = copy.copy(self)
+        topo.names = [mapping.get(name, name) for name in self.names]
+        topo.ids = {name: i for i, name in enumerate(topo.names)}
+        topo.keys = [
+            (channel, topo.names[u], topo.names[v])
+            for (channel, _, _), u, v in zip(self.keys, self.tails, self.heads)
+        ]
+        return topo
+
+    def _bucket(self, demand: float) -> int:
+        # 辞書式コストは需要に依存するので2のべき乗ごとの区分でまとめる
+        if self.vectors is None:
+            return 0
+        return 1 << max(math.ceil(demand * AMOUNT_RESOLUTION), 1).bit_length()
+
+    def _costs(self, demand: float) -> Tuple[int, List]:
+        bucket = self._bucket(demand)
+        if self.vectors is None:
+            return bucket, [1.0] * len(self.tails)
+        # 非巡回な計画のパスは (ノード数-1) 辺以下
+        units = bucket * max(self.n_nodes - 1, 1)
+        scales = lex_scales(self.vectors, units)
+        return bucket, [sum(c * w for c, w in zip(v, scales)) for v in self.vectors]
+
+    def arcs(self, demand: float) -> List[WArc]:
+        """
+        Weighted arcs over ids, each standing for one arc index. Lexicographic
+        costs depend on the demand, so they are cached per power-of-two bucket.
+        """
+        bucket = self._bucket(demand)
+        if bucket not in self._arcs:
+            _, costs = self._costs(demand)
+            self._arcs[bucket] = [
+                (self.tails[i], self.heads[i], costs[i], (i,))
+                for i in range(len(self.tails))
+            ]
+        return self._arcs[bucket]
+
+    def network(self, demand: float) -> _Network:
+        # 残余ネットワーク (arcs() と同じ区分ごとに一度だけ作る)
+        bucket = self._bucket(demand)
+        if bucket not in self._nets:
+            _, costs = self._costs(demand)
+            self._nets[bucket] = _Network(self.n_nodes, self.tails, self.heads, costs)
+        return self._nets[bucket]
+
+    def solve_ids(
+        self,
+        balances: Dict[int, float],
+        reduce: bool = True,
+        time_budget: Optional[float] = None,
+    ) -> AnytimeResult:
+        """
+        Plan keyed by arc index (into self.keys). Exact solves run on the
+        compiled residual network, so they skip graph building and reduction
+        entirely; with `time_budget` the anytime solver runs over the cached
+        arcs, which it does not reduce either (`reduce` is passed on only for
+        compatibility).
+        """
+        demand = sum(-b for b in balances.values() if b < 0)
+        if time_budget is not None:
+            return settle_arcs(
+                balances, self.arcs(demand), reduce=reduce, time_budget=time_budget
+            )
+        # 合計は0
+        if abs(sum(balances.values())) > 1e-6:
+            raise ValueError("Balances must sum to 0")
+        flows, cost = self.network(demand).solve(balances)
+        return AnytimeResult(flows, cost, cost, 0.0, True)
+
+    def solve(
+        self,
+        balances: Dict[Person, float],
+        reduce: bool = True,
+        time_budget: Optional[float] = None,
+    ) -> AnytimeResult:
+        by_id: Dict[int, float] = {}
+        extra = self.n_nodes
+        for name, b in balances.items():
+            i = self.ids.get(name)
+            if i is None:
+                # どのチャネルにもいない人 (残高が0でなければ解なし)
+                i = extra
+                extra += 1
+            by_id[i] = b
+        result = self.solve_ids(by_id, reduce=reduce, time_budget=time_budget)
+        result.plan = {self.keys[i]: f for i, f in result.plan.items()}
+        return result
+
+    def settle(
+        self,
+        balances: Dict[Person, float],
+        reduce: bool = True,
+        time_budget: Optional[float] = None,
+    ) -> Dict[PlanKey, float]:
+        return self.solve(balances, reduce=reduce, time_budget=time_budget).plan
@@ -0,0 +1,124 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from channel_topology import ChannelTopology
+from fx_rates import FxTable
+from main import CHANNELS_FILE, _canon
+from optimal_settlement import Person, PlanKey
+from registry_decode import decode_registry
+from tricount_read import get_net_by_member, settlement_currency
+
+
+class IdentityMap:
+    """
+    Stable person identity for members of different registries. A member is
+    looked up by (registry, membership id) first, then by display name via
+    `aliases`, and otherwise by its canonical display name. Registries are
+    identified by their label (for settle_cli, the path as given). Loaded
+    from JSON like
+    {"members": {"trips/a.json": {"3": "Gowtham"}}, "aliases": {"Matthew": "Matt"}}
+    """
+
+    def __init__(
+        self,
+        members: Optional[Dict[str, Dict[int, str]]] = None,
+        aliases: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.members = {
+            (registry, int(mid)): _canon(person)
+            for registry, table in (members or {}).items()
+            for mid, person in table.items()
+        }
+        self.aliases = {_canon(a): _canon(p) for a, p in (aliases or {}).items()}
+
+    @classmethod
+    def from_file(cls, path: str) -> "IdentityMap":
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        return cls(cfg.get("members"), cfg.get("aliases"))
+
+    def person(self, name: str) -> Person:
+        # 表示名 (チャネル設定の名前も) -> 人
+        if not isinstance(name, str):
+            # メンバーシップIDはレジストリごとなので、まとめた精算では使えない
+            raise ValueError(f"Channel config entry must be a name here: {name}")
+        key = _canon(name)
+        return self.aliases.get(key, key)
+
+    def explicit(self, registry: str, mid: int) -> bool:
+        return (registry, mid) in self.members
+
+    def __call__(self, registry: str, mid: int, name: str) -> Person:
+        person = self.members.get((registry, mid))
+        return person if person is not None else self.person(name)
+
+
+@dataclass
+class Consolidated:
+    balances: Dict[Person, float] = field(default_factory=dict)
+    # 人 -> 最初に見た表示名
+    names: Dict[Person, str] = field(default_factory=dict)
+    registries: int = 0
+
+
+def consolidate(
+    registries: Iterable[Tuple[str, Any]],
+    identity: Optional[IdentityMap] = None,
+    currency: Optional[str] = None,
+    fx: Optional[FxTable] = None,
+) -> Consolidated:
+    """
+    Merges the per-member balances of many registries, given as (label, data)
+    pairs, into one balance per person. Registries are read one at a time, so
+    only the running totals stay in memory. Members of one registry are only
+    merged into one person by explicit `identity.members` entries; two of
+    them matched by name alone are rejected, since same-name members of one
+    registry are different people. Everything is summed in
+    `currency` (by default the first registry's); entries in any other
+    currency need the rate table `fx`.
+    """
+    identity = identity or IdentityMap()
+    out = Consolidated()
+    for label, data in registries:
+        reg = decode_registry(data)
+        # 通貨の指定がなければ最初のレジストリの通貨にそろえる
+        currency = currency or settlement_currency(reg)
+        net, names = get_net_by_member(reg, currency, fx)
+        # 名前だけで決まった人 -> そのメンバー (同じレジストリ内の衝突検出用)
+        by_name: Dict[Person, int] = {}
+        for mid, amount in net.items():
+            person = identity(label, mid, names[mid])
+            if not identity.explicit(label, mid):
+                other = by_name.setdefault(person, mid)
+                if other != mid:
+                    raise ValueError(
+                        f"Members {other} and {mid} of {label} are both {person!r}; "
+                        "separate them in the identity map"
+                    )
+            out.names.setdefault(person, names[mid])
+            out.balances[person] = out.balances.get(person, 0.0) + amount
+        out.registries += 1
+
+    out.balances = {p: round(b, 3) for p, b in out.balances.items()}
+    return out
+
+
+def consolidated_topology(
+    channels_file: str = CHANNELS_FILE, identity: Optional[IdentityMap] = None
+) -> ChannelTopology:
+    # チャネル設定の名前を人に解決したグラフ
+    identity = identity or IdentityMap()
+    return ChannelTopology.from_file(channels_file, resolve=identity.person)
+
+
+def settle_consolidated(
+    cons: Consolidated,
+    channels_file: str = CHANNELS_FILE,
+    identity: Optional[IdentityMap] = None,
+    time_budget: Optional[float] = None,
+    topology: Optional[ChannelTopology] = None,
+) -> Dict[PlanKey, float]:
+    # 全レジストリ分の残高を、全員のチャネルをまとめたグラフで一度だけ解く
+    topology = topology or consolidated_topology(channels_file, identity)
+    return topology.settle(cons.balances, time_budget=time_budget)
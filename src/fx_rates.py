@@ -0,0 +1,107 @@
+import json
+import os
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from registry_decode import Entry
+
+
+class FxTable:
+    """
+    Date-keyed exchange rates loaded from a local JSON file like
+    {"base": "USD", "rates": {"2025-01-01": {"EUR": 1.09, "JPY": 0.0067}}}
+    where each rate is the value of one unit of the currency in `base`. An
+    entry uses the latest rate dated on or before its own day.
+    """
+
+    def __init__(self, base: str, rates: Dict[str, Dict[str, float]]) -> None:
+        self.base = base
+        # 通貨ごとに日付順の (日付, レート) 配列
+        self.dates: Dict[str, List[str]] = {}
+        self.rates: Dict[str, array] = {}
+        for day in sorted(rates):
+            for cur, rate in rates[day].items():
+                if rate <= 0:
+                    raise ValueError(f"FX rate must be positive: {cur} on {day}")
+                self.dates.setdefault(cur, []).append(day)
+                self.rates.setdefault(cur, array("d")).append(float(rate))
+
+    @classmethod
+    def from_file(cls, path: str) -> "FxTable":
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        return cls(cfg["base"], cfg["rates"])
+
+    def _to_base(self, cur: str, days: Sequence[str]) -> List[float]:
+        # days は昇順: 二分探索は一度だけ、あとは前に進むだけ
+        if cur == self.base:
+            return [1.0] * len(days)
+        dates = self.dates.get(cur)
+        if not dates:
+            raise ValueError(f"No FX rates for {cur}")
+        rates = self.rates[cur]
+        out = []
+        k = bisect_right(dates, days[0]) if days else 0
+        for day in days:
+            while k < len(dates) and dates[k] <= day:
+                k += 1
+            if k == 0 and day:
+                raise ValueError(f"No FX rate for {cur} on or before {day}")
+            # 日付のないエントリは最初のレート
+            out.append(rates[max(k - 1, 0)])
+        return out
+
+    def factors(
+        self, currency: str, target: str, days: Sequence[str]
+    ) -> Dict[str, float]:
+        """
+        Multipliers converting `currency` to `target` for each distinct day,
+        as {day: factor}, computed in one pass over the sorted days.
+        """
+        unique = sorted(set(days))
+        if currency == target:
+            return dict.fromkeys(unique, 1.0)
+        src = self._to_base(currency, unique)
+        dst = self._to_base(target, unique)
+        return {d: s / t for d, s, t in zip(unique, src, dst)}
+
+
+def entry_factors(
+    entries: Sequence[Entry], fx: Optional[FxTable], target: str, default: str = ""
+) -> array:
+    """
+    Conversion factor per entry into `target`. Entries are grouped by
+    currency (an empty currency means `default`, the registry's own) and each
+    group is converted in one pass over its distinct days. Without a rate
+    table every entry must already be in `target`.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, e in enumerate(entries):
+        groups.setdefault(e.currency or default, []).append(i)
+
+    out = array("d", [1.0]) * len(entries)
+    for cur, idx in groups.items():
+        if cur == target:
+            continue
+        if fx is None:
+            raise ValueError(f"No FX rates for {cur} (settling in {target})")
+        days = [entries[i].date[:10] for i in idx]
+        by_day = fx.factors(cur, target, days)
+        for i, day in zip(idx, days):
+            out[i] = by_day[day]
+    return out
+
+
+# (絶対パス, 更新時刻) -> 読み込み済みの表
+_CACHE: Dict[Tuple[str, int], FxTable] = {}
+
+
+def load_fx_table(path: str) -> FxTable:
+    # 同じファイルは一度だけ読む (書き換えられたら読み直す)
+    path = os.path.abspath(path)
+    key = (path, os.stat(path).st_mtime_ns)
+    table = _CACHE.get(key)
+    if table is None:
+        table = _CACHE[key] = FxTable.from_file(path)
+    return table
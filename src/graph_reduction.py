@@ -0,0 +1,85 @@
+from typing import Dict, List, Tuple
+
+Person = str
+Channel = str
+PlanKey = Tuple[Channel, Person, Person]
+# (from, to, cost, 元のチャネル辺の列)
+WArc = Tuple[Person, Person, float, Tuple[PlanKey, ...]]
+
+
+def collapse_parallel(arcs: List[WArc]) -> List[WArc]:
+    # 同じ向きの並行辺は最安(同コストなら先に来た方)だけ残す
+    best: Dict[Tuple[Person, Person], WArc] = {}
+    for a in arcs:
+        k = (a[0], a[1])
+        if k not in best or a[2] < best[k][2]:
+            best[k] = a
+    return list(best.values())
+
+
+def reduce_graph(
+    balances: Dict[Person, float], arcs: List[WArc]
+) -> Tuple[List[Person], List[WArc]]:
+    """
+    Shrinks the channel graph without changing the optimal cost:
+    zero-balance members with at most one neighbour are dropped, zero-balance
+    members with exactly two neighbours are contracted (u -> x -> w becomes one
+    u -> w arc with the summed cost), and parallel arcs keep only the cheapest.
+    Returns the remaining nodes and arcs; each arc keeps the path it stands for.
+    """
+    out: Dict[Person, Dict[Person, WArc]] = {n: {} for n in balances}
+    inc: Dict[Person, Dict[Person, WArc]] = {n: {} for n in balances}
+
+    def add(a: WArc):
+        u, v = a[0], a[1]
+        if v in out[u] and out[u][v][2] <= a[2]:
+            return
+        out[u][v] = a
+        inc[v][u] = a
+
+    def remove(x: Person):
+        for w in out[x]:
+            del inc[w][x]
+        for u in inc[x]:
+            del out[u][x]
+        del out[x]
+        del inc[x]
+
+    for a in collapse_parallel(arcs):
+        if a[0] in out and a[1] in out and a[0] != a[1]:
+            add(a)
+
+    stack = list(balances)
+    while stack:
+        x = stack.pop()
+        if x not in out or abs(balances[x]) > 1e-9:
+            continue
+        nb = list(dict.fromkeys([*out[x], *inc[x]]))
+        if len(nb) <= 1:
+            # 行き止まり: 通り抜ける流れはない
+            remove(x)
+            stack.extend(nb)
+        elif len(nb) == 2:
+            # 中継のみの次数2ノードを縮約
+            u, w = nb
+            new = []
+            for a, b in ((u, w), (w, u)):
+                if a in inc[x] and b in out[x]:
+                    ax, xb = inc[x][a], out[x][b]
+                    new.append((a, b, ax[2] + xb[2], ax[3] + xb[3]))
+            remove(x)
+            for a in new:
+                add(a)
+            stack.extend(nb)
+
+    nodes = [n for n in balances if n in out]
+    return nodes, [a for u in nodes for a in out[u].values()]
+
+
+def expand_flows(flows: Dict[int, float], arcs: List[WArc]) -> Dict[PlanKey, float]:
+    # 縮約した辺の流量を元のチャネル辺ごとに戻す
+    plan: Dict[PlanKey, float] = {}
+    for i, f in flows.items():
+        for k in arcs[i][3]:
+            plan[k] = plan.get(k, 0.0) + f
+    return {k: v for k, v in plan.items() if abs(v) > 1e-8}
@@ -0,0 +1,150 @@
+"""
+End-to-end load test: concurrent clients run fetch -> get_net_from_tricount ->
+optimal_settle against a Tricount API (by default a mock started in-process)
+and the throughput and latency percentiles are reported.
+
+    uv run python src/load_test.py --clients 8 --requests 400 --entries 2000
+    uv run python src/load_test.py --base-url http://127.0.0.1:8766 --latency 0.05
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from mock_tricount import MockTricount, start_mock
+from optimal_settlement import Arc, optimal_settle
+from tricount_read import get_net_from_tricount
+
+
+@dataclass
+class LoadReport:
+    requests: int
+    ok: int
+    errors: int
+    seconds: float
+    throughput: float  # 成功した fetch→settle の回数/秒
+    p50_ms: float
+    p95_ms: float
+
+
+def ring_channels(names: Sequence[str]) -> Tuple[List[Arc], List[Arc]]:
+    # 合成レジストリ用: Zelle は輪、Venmo は向かい側への弦
+    names = sorted(names)
+    n = len(names)
+    zelle = [(names[i], names[(i + 1) % n]) for i in range(n)] if n > 1 else []
+    venmo = [(names[i], names[(i + n // 2) % n]) for i in range(0, n // 2, 3)]
+    return zelle, venmo
+
+
+def _percentile(sorted_xs: List[float], q: float) -> float:
+    if not sorted_xs:
+        return 0.0
+    return sorted_xs[min(int(q * len(sorted_xs)), len(sorted_xs) - 1)]
+
+
+def run_load(
+    base_url: str,
+    keys: Sequence[str] = ("load-test",),
+    clients: int = 4,
+    requests: int = 100,
+    reauth: bool = False,
+) -> LoadReport:
+    """
+    Each client authenticates once (or on every request with `reauth`) and
+    then repeatedly re-fetches its registry, computes the balances and settles
+    them. Failed requests (HTTP errors, malformed data, infeasible plans) are
+    counted, and the client re-authenticates on its next request.
+    """
+    from requests import RequestException
+    from tricount_api import TricountAPI
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = 0
+
+    def client(i: int, n: int) -> None:
+        nonlocal errors
+        key = keys[i % len(keys)]
+        api = None
+        for _ in range(n):
+            t = time.perf_counter()
+            try:
+                if api is None or reauth:
+                    api = TricountAPI(tricount_key=key, base_url=base_url)
+                else:
+                    api.update_data()
+                balances = get_net_from_tricount(api.get_registry())
+                zelle, venmo = ring_channels(list(balances))
+                optimal_settle(balances, zelle, venmo)
+            except (ValueError, RuntimeError, RequestException):
+                api = None
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t)
+
+    shares = [requests // clients + (i < requests % clients) for i in range(clients)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for f in [pool.submit(client, i, n) for i, n in enumerate(shares)]:
+            f.result()
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return LoadReport(
+        requests=requests,
+        ok=len(latencies),
+        errors=errors,
+        seconds=round(seconds, 3),
+        throughput=round(len(latencies) / seconds, 2) if seconds > 0 else 0.0,
+        p50_ms=round(_percentile(latencies, 0.50) * 1000, 2),
+        p95_ms=round(_percentile(latencies, 0.95) * 1000, 2),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end Tricount load test")
+    parser.add_argument("--base-url", default=None, help="default: in-process mock")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--keys", type=int, default=1, help="distinct registries")
+    parser.add_argument("--reauth", action="store_true", help="login per request")
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        mock = MockTricount(args.members, args.entries, args.latency, args.error_rate)
+        server = start_mock(mock)
+        base_url = server.base_url
+    try:
+        report = run_load(
+            base_url,
+            keys=[f"load-test-{i}" for i in range(args.keys)],
+            clients=args.clients,
+            requests=args.requests,
+            reauth=args.reauth,
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    print(
+        f"{report.ok}/{report.requests} ok, {report.errors} errors in {report.seconds}s: "
+        f"{report.throughput} settlements/s, p50 {report.p50_ms} ms, p95 {report.p95_ms} ms"
+    )
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,79 +1,115 @@
-from typing import Tuple
-from optimal_settlement import optimal_settle
-from tricount_read import fetch_tricount_data, get_net_from_tricount
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+from channel_topology import ChannelTopology
+from plan_export import MarkdownWriter, make_record
+from tricount_read import fetch_tricount_data, get_net_by_member
 
 Person = str
 Channel = str
 Arc = Tuple[Person, Person]
 
+CHANNELS_FILE = os.environ.get(
+    "CHANNELS_FILE", os.path.join(os.path.dirname(__file__), "..", "channels.json")
+)
+
+
+# normalize names to canonical form to avoid case/whitespace mismatches
+def _canon(name: str) -> str:
+    return name.strip().lower()
+
+
+def _config_key(entry: object) -> object:
+    # 整数はメンバーシップID、文字列は名前
+    return entry if isinstance(entry, int) else _canon(entry)
+
+
+# (絶対パス, 更新時刻) -> コンパイル済みのチャネルグラフ
+_TOPOLOGIES: Dict[Tuple[str, int], ChannelTopology] = {}
+
+
+def load_topology(channels_file: str = CHANNELS_FILE) -> ChannelTopology:
+    """
+    Channel config compiled once per file (and again only when it changes),
+    keyed by canonical config names and by the integer membership ids the
+    config may use instead, e.g. ["Matt", 3].
+    """
+    path = os.path.abspath(channels_file)
+    key = (path, os.stat(path).st_mtime_ns)
+    topology = _TOPOLOGIES.get(key)
+    if topology is None:
+        topology = _TOPOLOGIES[key] = ChannelTopology.from_file(
+            path, resolve=_config_key
+        )
+    return topology
+
+
+def member_keys(names: Dict[int, str], topology: ChannelTopology) -> Dict[object, int]:
+    """
+    Maps the config entries of a compiled topology to membership ids. An id
+    entry matches that member; a name matches the members with that display
+    name that are not referenced by id, and is rejected unless exactly one of
+    them is left.
+    """
+    out: Dict[object, int] = {}
+    by_name: Dict[str, List[int]] = {}
+    for mid, name in names.items():
+        if mid in topology.ids:
+            out[mid] = mid
+        by_name.setdefault(_canon(name), []).append(mid)
+
+    for key in topology.names:
+        mids = by_name.get(key) if isinstance(key, str) else None
+        if not mids:
+            continue
+        left = [mid for mid in mids if mid not in out]
+        if not left:
+            # 同じ人が名前とIDの両方で出てくると別のノードになってしまう
+            raise ValueError(f"Member given by both name and id in channel config: {key}")
+        if len(left) > 1:
+            raise ValueError(f"Ambiguous member name in channel config: {key}")
+        out[key] = left[0]
+    return out
+
+
+def member_topology(
+    names: Dict[int, str], channels_file: str = CHANNELS_FILE
+) -> ChannelTopology:
+    # コンパイル済みのグラフをこのレジストリのIDに付け替えるだけ
+    topology = load_topology(channels_file)
+    return topology.relabel(member_keys(names, topology))
+
+
+def settle_data(
+    data: Any,
+    channels_file: str = CHANNELS_FILE,
+    time_budget: Optional[float] = None,
+    currency: Optional[str] = None,
+    fx=None,
+):
+    # Compute net balances (keyed by membership id, in `currency` or the
+    # registry's own, converting other currencies with the FxTable `fx`) and
+    # settle them
+    balances, names = get_net_by_member(data, currency, fx)
+
+    # Zelle and Venmo pairs (display names or ids) come from the channel config
+    topology = member_topology(names, channels_file)
+
+    # Use optimal settlement algorithm with id-keyed balances and pairs
+    settlement_plan = topology.settle(balances, time_budget=time_budget)
+    return balances, names, settlement_plan, topology
+
+
+def print_settlement(balances, names, settlement_plan, topology=None):
+    MarkdownWriter(sys.stdout).write(
+        make_record("", balances, names, settlement_plan, topology)
+    )
+
 
 def main():
-    # Fetch data and compute net balances
+    # Fetch data and settle it
     data = fetch_tricount_data()
-    balances = get_net_from_tricount(data)
-
-    # normalize names to canonical form to avoid case/whitespace mismatches
-    def _canon(name: str) -> str:
-        return name.strip().lower()
-
-    canon_to_display = {}
-    balances_canon = {}
-    for name, amt in balances.items():
-        c = _canon(name)
-        canon_to_display[c] = name
-        balances_canon[c] = float(amt)
-
-    print("=== Simple Network-Based Settlement ===")
-    print("## Balances:")
-    for person, balance in balances.items():
-        print(f"- *{person}*: ${balance:.2f}")
-    # print(f"Balance sum: {sum(balances_canon.values())}")
-
-    # Define Zelle and Venmo pairs (display names)
-    zelle_pairs = [
-        ("Matt", "Hibiki"),
-        ("Matt", "Gowtham"),
-        ("Hibiki", "Gowtham"),
-    ]
-
-    venmo_pairs = [
-        ("Guillermo", "Matt"),
-    ]
-
-    # Canonicalize pairs
-    zelle_pairs_canon = [(_canon(a), _canon(b)) for a, b in zelle_pairs]
-    venmo_pairs_canon = [(_canon(a), _canon(b)) for a, b in venmo_pairs]
-
-    # Use optimal settlement algorithm with canonicalized balances and pairs
-    settlement_plan = optimal_settle(
-        balances_canon, zelle_pairs_canon, venmo_pairs_canon
-    )
-
-    print("\n ## Settlement Plan:")
-    total_amount = 0.0
-    for (channel, sender, receiver), amount in settlement_plan.items():
-        if amount > 0:
-            s_disp = canon_to_display.get(sender, sender)
-            r_disp = canon_to_display.get(receiver, receiver)
-            print(f"- *{s_disp}* → *{r_disp}*: ${amount:.2f} ({channel})")
-            total_amount += amount
-
-    print(f"\nTotal transaction amount: ${total_amount:.2f}")
-
-    # Verify the settlement
-    net_flows = {person: 0.0 for person in balances_canon}
-    for (channel, sender, receiver), amount in settlement_plan.items():
-        if amount > 0:
-            net_flows[sender] -= amount  # Sender pays money (negative flow)
-            net_flows[receiver] += amount  # Receiver gets money (positive flow)
-
-    # print("\nVerification:")
-    for canon_name, display in canon_to_display.items():
-        expected = balances_canon.get(canon_name, 0.0)
-        actual = net_flows.get(canon_name, 0.0)
-        # print(
-        #     f"{display}: expected {expected:.2f}, actual {actual:.2f}, diff {abs(expected - actual):.6f}"
-        # )
+    print_settlement(*settle_data(data))
 
 
 if __name__ == "__main__":
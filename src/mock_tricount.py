@@ -0,0 +1,264 @@
+"""
+Local stand-in for the Tricount API, serving synthetic registries so the
+fetch -> parse -> settle path can be exercised and load-tested offline.
+
+    uv run python src/mock_tricount.py --port 8766 --members 20 --entries 2000
+    TRICOUNT_BASE_URL=http://127.0.0.1:8766 uv run python src/main.py
+
+POST /v1/session-registry-installation        -> token and user id
+GET  /v1/user/{id}/registry?public_identifier_token=...  -> registry
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+USER_ID = 7001
+_REGISTRY_PATH = re.compile(r"^/v1/user/(\d+)/registry$")
+
+
+def _membership(mid: int, name: str) -> Dict[str, Any]:
+    return {
+        "RegistryMembershipNonUser": {
+            "id": mid,
+            "uuid": f"m-{mid}",
+            "status": "ACTIVE",
+            "alias": {
+                "display_name": name,
+                "pointer": {"type": "NAME", "value": name, "name": name},
+            },
+        }
+    }
+
+
+def _amount(cents: int, currency: str) -> Dict[str, str]:
+    return {"value": f"{-cents / 100:.2f}", "currency": currency}
+
+
+def synthetic_registry(
+    members: int = 10, entries: int = 100, seed: Any = 0, currency: str = "USD"
+) -> Dict[str, Any]:
+    """
+    Registry response with `members` people ("m0", "m1", ...) and `entries`
+    expenses, each paid by one member and split in whole cents among a random
+    subset. The same seed always gives the same registry.
+    """
+    rng = random.Random(seed)
+    people = [(i + 1, f"m{i}") for i in range(members)]
+    start = datetime(2025, 1, 1, 12)
+
+    rows = []
+    for n in range(entries):
+        cents = rng.randint(100, 50000)
+        payer = rng.choice(people)
+        split = rng.sample(people, rng.randint(1, min(members, 6)))
+        base, rest = divmod(cents, len(split))
+        rows.append(
+            {
+                "RegistryEntry": {
+                    "id": n + 1,
+                    "date": f"{start + timedelta(hours=n):%Y-%m-%d %H:%M:%S}.000000",
+                    "description": f"Expense {n + 1}",
+                    "type_transaction": "NORMAL",
+                    "amount": _amount(cents, currency),
+                    "membership_owned": _membership(*payer),
+                    "allocations": [
+                        {
+                            "amount": _amount(base + (k == 0) * rest, currency),
+                            "type": "AMOUNT",
+                            "membership": _membership(*person),
+                        }
+                        for k, person in enumerate(split)
+                    ],
+                }
+            }
+        )
+    return {
+        "Response": [
+            {
+                "Registry": {
+                    "id": 100,
+                    "uuid": f"reg-{seed}",
+                    "title": "Synthetic",
+                    "currency": currency,
+                    "memberships": [_membership(*p) for p in people],
+                    "all_registry_entry": rows,
+                }
+            }
+        ]
+    }
+
+
+class MockTricount:
+    """
+    Behaviour of the mock: registry size, per-request latency (seconds) and
+    the fraction of requests answered with an error. Registries are generated
+    once per tricount key and cached as encoded JSON.
+    """
+
+    def __init__(
+        self,
+        members: int = 10,
+        entries: int = 100,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.members = members
+        self.entries = entries
+        self.latency = latency
+        self.error_rate = error_rate
+        self.tokens: set = set()
+        self.requests = 0
+        self.errors = 0
+        self._bodies: Dict[str, bytes] = {}
+        self._rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def registry_body(self, key: str) -> bytes:
+        with self.lock:
+            body = self._bodies.get(key)
+        if body is None:
+            data = synthetic_registry(self.members, self.entries, seed=key)
+            body = json.dumps(data).encode("utf-8")
+            with self.lock:
+                self._bodies[key] = body
+        return body
+
+    def new_token(self) -> str:
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens.add(token)
+        return token
+
+    def fail_now(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            fail = self._rng.random() < self.error_rate
+            self.errors += fail
+        return fail
+
+
+def _error(description: str) -> Dict[str, Any]:
+    return {"Error": [{"error_description": description}]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MockServer"
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _reply(self, status: int, body: Any) -> None:
+        raw = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _begin(self) -> bool:
+        mock = self.server.mock
+        if mock.latency:
+            time.sleep(mock.latency)
+        if mock.fail_now():
+            self._reply(500, _error("Injected failure"))
+            return False
+        return True
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if urlsplit(self.path).path != "/v1/session-registry-installation":
+            self._reply(404, _error("Not found"))
+            return
+        if not self._begin():
+            return
+        token = self.server.mock.new_token()
+        self._reply(
+            200,
+            {
+                "Response": [
+                    {"Id": {"id": 1}},
+                    {"Token": {"token": token}},
+                    {"ServerPublicKey": {"server_public_key": ""}},
+                    {"UserPerson": {"id": USER_ID}},
+                ]
+            },
+        )
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        m = _REGISTRY_PATH.match(url.path)
+        if not m:
+            self._reply(404, _error("Not found"))
+            return
+        if not self._begin():
+            return
+        mock = self.server.mock
+        if self.headers.get("X-Bunq-Client-Authentication") not in mock.tokens:
+            self._reply(401, _error("Insufficient authentication"))
+            return
+        key = parse_qs(url.query).get("public_identifier_token", [""])[0]
+        if int(m.group(1)) != USER_ID or not key:
+            self._reply(404, _error("Registry not found"))
+            return
+        self._reply(200, mock.registry_body(key))
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, mock: MockTricount, quiet: bool = True) -> None:
+        super().__init__(address, _Handler)
+        self.mock = mock
+        self.quiet = quiet
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock(
+    mock: Optional[MockTricount] = None, host: str = "127.0.0.1", port: int = 0
+) -> MockServer:
+    # バックグラウンドのスレッドで起動 (port=0 なら空いているポート)
+    server = MockServer((host, port), mock or MockTricount())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mock Tricount API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0..1")
+    args = parser.parse_args(argv)
+
+    mock = MockTricount(args.members, args.entries, args.latency, args.error_rate)
+    server = MockServer((args.host, args.port), mock, quiet=False)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,136 +1,414 @@
-from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple, Optional, Sequence
 import heapq
+import math
+import time
+
+from graph_reduction import WArc, expand_flows, reduce_graph
 
 Person = str
 Channel = str
 Arc = Tuple[Person, Person]
 PlanKey = Tuple[Channel, Person, Person]
 
+# 金額の最小単位(1/1000ドル)。辞書式コストの重み付けに使う
+AMOUNT_RESOLUTION = 1000
 
-def optimal_settle(
+
+# 無向→両向き
+def mk_arcs(pairs: List[Arc], channel: Channel) -> List[PlanKey]:
+    # 両向き、重複は最初のものだけ (順番は保つ)
+    return list(
+        dict.fromkeys(
+            k for a, b in pairs if a != b for k in ((channel, a, b), (channel, b, a))
+        )
+    )
+
+
+class Edge:
+    __slots__ = ("to", "rev", "cap", "cost", "key")
+
+    def __init__(
+        self, to: int, rev: int, cap: float, cost: float, key: Optional[int]
+    ):
+        self.to = to
+        self.rev = rev
+        self.cap = cap
+        self.cost = cost
+        self.key = key
+
+
+class MCMF:
+    def __init__(self, N: int):
+        self.g: List[List[Edge]] = [[] for _ in range(N)]
+        # 最後のDijkstra後のポテンシャルと、流した分のコスト
+        self.h: List[float] = [0] * N
+        self.cost = 0.0
+
+    def add_edge(
+        self,
+        fr: int,
+        to: int,
+        cap: float,
+        cost: float,
+        key: Optional[int] = None,
+    ):
+        fwd = Edge(to, len(self.g[to]), cap, cost, key)
+        rev = Edge(fr, len(self.g[fr]), 0.0, -cost, None)
+        self.g[fr].append(fwd)
+        self.g[to].append(rev)
+
+    def min_cost_flow(
+        self, s: int, t: int, max_f: float, deadline: Optional[float] = None
+    ):
+        """
+        Successive shortest paths. If `deadline` (a time.perf_counter() value)
+        passes, stops early and returns the partial flow sent so far.
+        """
+        N = len(self.g)
+        INF = float("inf")
+        # 整数コストなら距離もポテンシャルも整数のまま(桁落ちしない)
+        h = self.h = [0] * N
+        self.cost = 0.0
+        flow = 0.0
+        key_flow: Dict[int, float] = {}
+
+        last = 0.0  # 直前の1回の所要時間 (これ以上残っていなければ打ち切る)
+        while flow + 1e-12 < max_f:
+            if deadline is not None:
+                started = time.perf_counter()
+                if started + last >= deadline:
+                    break
+
+            dist = [INF] * N
+            prev_v = [-1] * N
+            prev_e = [-1] * N
+            dist[s] = 0
+            pq = [(0, s)]
+            while pq:
+                d, v = heapq.heappop(pq)
+                if d > dist[v]:
+                    continue
+                for i, e in enumerate(self.g[v]):
+                    if e.cap <= 1e-12:
+                        continue
+                    nd = d + e.cost + h[v] - h[e.to]
+                    if nd < dist[e.to]:
+                        dist[e.to] = nd
+                        prev_v[e.to] = v
+                        prev_e[e.to] = i
+                        heapq.heappush(pq, (nd, e.to))
+
+            if dist[t] == INF:
+                if max_f - flow <= 1e-6:  # 浮動小数の端数
+                    break
+                raise RuntimeError("No feasible path")
+
+            for v in range(N):
+                if dist[v] < INF:
+                    h[v] += dist[v]
+
+            add_f = max_f - flow
+            v = t
+            while v != s:
+                pv = prev_v[v]
+                pe = prev_e[v]
+                e = self.g[pv][pe]
+                add_f = min(add_f, e.cap)
+                v = pv
+
+            v = t
+            while v != s:
+                pv = prev_v[v]
+                pe = prev_e[v]
+                e = self.g[pv][pe]
+                re = self.g[v][e.rev]
+                e.cap -= add_f
+                re.cap += add_f
+                if e.key is not None:
+                    key_flow[e.key] = key_flow.get(e.key, 0.0) + add_f
+                elif re.key is not None:  # 逆辺で押し戻した分
+                    key_flow[re.key] = key_flow.get(re.key, 0.0) - add_f
+                v = pv
+
+            flow += add_f
+            self.cost += add_f * (h[t] - h[s])
+            if deadline is not None:
+                last = time.perf_counter() - started
+
+        return key_flow, flow
+
+
+@dataclass
+class AnytimeResult:
+    plan: Dict[PlanKey, float]
+    cost: float
+    lower_bound: float
+    gap: float
+    optimal: bool
+
+
+def plan_cost(plan: Dict[PlanKey, float]) -> float:
+    # 1ホップ=コスト1
+    return sum(plan.values())
+
+
+def _unit_arcs(arcs: List[PlanKey]) -> List[WArc]:
+    # 1ホップ=コスト1
+    return [(u, v, 1.0, ((ch, u, v),)) for ch, u, v in arcs]
+
+
+def arc_cost_vectors(
+    arcs: List[PlanKey],
+    objective: Sequence[str] = ("hops",),
+    channel_costs: Optional[Dict[Channel, Dict[str, int]]] = None,
+    pair_costs: Optional[Dict[PlanKey, Dict[str, int]]] = None,
+) -> Dict[PlanKey, Tuple[int, ...]]:
+    """
+    Per-arc cost of each criterion in `objective`, per unit of money moved.
+    A pair weight (keyed by (channel, a, b), applied in both directions)
+    overrides the channel weight; "hops" defaults to 1, anything else to 0.
+    """
+    channel_costs = channel_costs or {}
+    pair_costs = pair_costs or {}
+    out: Dict[PlanKey, Tuple[int, ...]] = {}
+    for k in arcs:
+        ch, u, v = k
+        pair = pair_costs.get(k, pair_costs.get((ch, v, u), {}))
+        vec = []
+        for c in objective:
+            w = pair.get(c, channel_costs.get(ch, {}).get(c, 1 if c == "hops" else 0))
+            if not isinstance(w, int) or w < 0:
+                raise ValueError(f"Cost weight {c}={w!r} must be a non-negative int")
+            vec.append(w)
+        out[k] = tuple(vec)
+    return out
+
+
+def lex_scales(vectors: Iterable[Tuple[int, ...]], units: int) -> List[int]:
+    """
+    Weights that fold cost vectors into one integer so that a single
+    min-cost-flow run minimises them lexicographically. Each criterion is
+    weighted by one more than the largest total all lower criteria can reach,
+    where `units` bounds the flow (in AMOUNT_RESOLUTION units) times path length.
+    """
+    vectors = list(vectors)
+    if not vectors:
+        return []
+    n_crit = len(vectors[0])
+    scales = [1] * n_crit
+    for i in range(n_crit - 2, -1, -1):
+        lower = max(
+            sum(vec[j] * scales[j] for j in range(i + 1, n_crit)) for vec in vectors
+        )
+        scales[i] = units * lower + 1
+    return scales
+
+
+def lexicographic_costs(
+    vectors: Dict[PlanKey, Tuple[int, ...]], balances: Dict[Person, float]
+) -> Dict[PlanKey, int]:
+    # 非巡回な計画のパスは len(balances)-1 辺以下
+    demand = sum(-b for b in balances.values() if b < 0)
+    units = math.ceil(demand * AMOUNT_RESOLUTION) * max(len(balances) - 1, 1)
+    scales = lex_scales(vectors.values(), units)
+    return {
+        k: sum(c * w for c, w in zip(vec, scales)) for k, vec in vectors.items()
+    }
+
+
+def plan_cost_vector(
+    plan: Dict[PlanKey, float], vectors: Dict[PlanKey, Tuple[int, ...]]
+) -> Tuple[float, ...]:
+    n_crit = len(next(iter(vectors.values()))) if vectors else 0
+    return tuple(
+        sum(f * vectors[k][i] for k, f in plan.items()) for i in range(n_crit)
+    )
+
+
+def _flow_cost(flows: Dict[int, float], arcs: List[WArc]) -> float:
+    return sum(f * arcs[i][2] for i, f in flows.items())
+
+
+def _tree_flows(balances: Dict[Person, float], arcs: List[WArc]) -> Dict[int, float]:
+    """
+    Feasible flows along a BFS spanning forest of the two-way arcs: each
+    subtree's net balance crosses the arc to its parent. Linear time, so it is
+    used to finish plans when the deadline is close.
+    """
+    at: Dict[Tuple[Person, Person], int] = {}
+    for i, (u, v, c, _) in enumerate(arcs):
+        j = at.setdefault((u, v), i)
+        if c < arcs[j][2]:
+            at[(u, v)] = i
+    adj: Dict[Person, List[Person]] = {}
+    for u, v in at:
+        if u < v and (v, u) in at:
+            adj.setdefault(u, []).append(v)
+            adj.setdefault(v, []).append(u)
+
+    parent: Dict[Person, Person] = {}
+    order: List[Person] = []
+    for root in balances:
+        if root in parent:
+            continue
+        parent[root] = root
+        start = len(order)
+        order.append(root)
+        while start < len(order):
+            u = order[start]
+            start += 1
+            for v in adj.get(u, ()):
+                if v not in parent:
+                    parent[v] = u
+                    order.append(v)
+
+    sub = {n: balances.get(n, 0.0) for n in order}
+    flows: Dict[int, float] = {}
+    for v in reversed(order):
+        p, b = parent[v], sub[v]
+        if p == v:
+            if abs(b) > 1e-6:
+                raise RuntimeError("No feasible path")
+            continue
+        sub[p] += b
+        if abs(b) > 1e-9:
+            # 部分木が借りていれば v -> p、貸していれば p -> v
+            i = at[(v, p)] if b < 0 else at[(p, v)]
+            flows[i] = flows.get(i, 0.0) + abs(b)
+    return flows
+
+
+def _greedy_flows(
     balances: Dict[Person, float],
-    zelle_pairs: List[Arc],
-    venmo_pairs: List[Arc],
-) -> Dict[PlanKey, float]:
-    # 合計は0
-    if abs(sum(balances.values())) > 1e-6:
-        raise ValueError("Balances must sum to 0")
+    arcs: List[WArc],
+    deadline: Optional[float] = None,
+) -> Dict[int, float]:
+    """
+    Each debtor (largest first) pays its nearest creditor with room left, in
+    rounds of one multi-source Dijkstra from the creditors. If `deadline`
+    passes between rounds, the remaining balances go along a spanning tree.
+    """
+    radj: Dict[Person, List[int]] = {}
+    for i, a in enumerate(arcs):
+        radj.setdefault(a[1], []).append(i)
 
-    nodes = sorted(balances.keys())
+    need = {n: b for n, b in balances.items() if b > 1e-9}
+    rest = {n: -b for n, b in balances.items() if b < -1e-9}
+    debtors = sorted(rest, key=lambda n: balances[n])
+    flows: Dict[int, float] = {}
+    while debtors:
+        if deadline is not None and time.perf_counter() >= deadline:
+            left = {n: r for n, r in need.items() if r > 1e-9}
+            left.update((d, -rest[d]) for d in debtors)
+            for i, f in _tree_flows(left, arcs).items():
+                flows[i] = flows.get(i, 0.0) + f
+            return _cancel_opposite(flows, arcs)
 
-    # 無向→両向き
-    def mk_arcs(pairs: List[Arc], channel: Channel) -> List[PlanKey]:
-        out: List[PlanKey] = []
-        seen = set()
-        for a, b in pairs:
-            if a == b:
+        # 残っている債権者からの逆向き多始点Dijkstra: nxt[v] は最寄り債権者への次の辺
+        dist = {c: 0.0 for c, r in need.items() if r > 1e-9}
+        nxt: Dict[Person, int] = {}
+        root = {c: c for c in dist}
+        pq = [(0.0, i, c) for i, c in enumerate(dist)]
+        cnt = len(pq)
+        done = set()
+        waiting = set(debtors)
+        while pq and waiting:
+            dv, _, v = heapq.heappop(pq)
+            if v in done:
                 continue
-            for u, v in ((a, b), (b, a)):
-                k = (channel, u, v)
-                if k not in seen:
-                    out.append(k)
-                    seen.add(k)
-        return out
-
-    arcs: List[PlanKey] = mk_arcs(zelle_pairs, "zelle") + mk_arcs(venmo_pairs, "venmo")
-
-    class Edge:
-        __slots__ = ("to", "rev", "cap", "cost", "key")
-
-        def __init__(
-            self, to: int, rev: int, cap: float, cost: float, key: Optional[PlanKey]
-        ):
-            self.to = to
-            self.rev = rev
-            self.cap = cap
-            self.cost = cost
-            self.key = key
-
-    class MCMF:
-        def __init__(self, N: int):
-            self.g: List[List[Edge]] = [[] for _ in range(N)]
-
-        def add_edge(
-            self,
-            fr: int,
-            to: int,
-            cap: float,
-            cost: float,
-            key: Optional[PlanKey] = None,
-        ):
-            fwd = Edge(to, len(self.g[to]), cap, cost, key)
-            rev = Edge(fr, len(self.g[fr]), 0.0, -cost, None)
-            self.g[fr].append(fwd)
-            self.g[to].append(rev)
-
-        def min_cost_flow(self, s: int, t: int, max_f: float):
-            N = len(self.g)
-            INF = 1e30
-            h = [0.0] * N
-            flow = 0.0
-            key_flow: Dict[PlanKey, float] = {}
-
-            while flow + 1e-12 < max_f:
-                dist = [INF] * N
-                prev_v = [-1] * N
-                prev_e = [-1] * N
-                dist[s] = 0.0
-                pq = [(0.0, s)]
-                while pq:
-                    d, v = heapq.heappop(pq)
-                    if d > dist[v] + 1e-15:
-                        continue
-                    for i, e in enumerate(self.g[v]):
-                        if e.cap <= 1e-12:
-                            continue
-                        nd = d + e.cost + h[v] - h[e.to]
-                        if nd + 1e-15 < dist[e.to]:
-                            dist[e.to] = nd
-                            prev_v[e.to] = v
-                            prev_e[e.to] = i
-                            heapq.heappush(pq, (nd, e.to))
-
-                if dist[t] >= INF / 2:
-                    raise RuntimeError("No feasible path")
-
-                for v in range(N):
-                    if dist[v] < INF / 2:
-                        h[v] += dist[v]
-
-                add_f = max_f - flow
-                v = t
-                while v != s:
-                    pv = prev_v[v]
-                    pe = prev_e[v]
-                    e = self.g[pv][pe]
-                    add_f = min(add_f, e.cap)
-                    v = pv
-
-                v = t
-                while v != s:
-                    pv = prev_v[v]
-                    pe = prev_e[v]
-                    e = self.g[pv][pe]
-                    re = self.g[v][e.rev]
-                    e.cap -= add_f
-                    re.cap += add_f
-                    if e.key is not None:
-                        key_flow[e.key] = key_flow.get(e.key, 0.0) + add_f
-                    v = pv
-
-                flow += add_f
-
-            return key_flow, flow
+            done.add(v)
+            # 残りの債務者が全員確定したらこの回は終わり
+            waiting.discard(v)
+            for i in radj.get(v, []):
+                u = arcs[i][0]
+                nd = dv + arcs[i][2]
+                if u not in done and nd < dist.get(u, float("inf")):
+                    dist[u] = nd
+                    nxt[u] = i
+                    root[u] = root[v]
+                    cnt += 1
+                    heapq.heappush(pq, (nd, cnt, u))
+
+        for d in debtors:
+            if d not in dist:
+                raise RuntimeError("No feasible path")
+            c = root[d]
+            if need[c] <= 1e-9:  # この回で埋まった
+                continue
+            amt = min(rest[d], need[c])
+            need[c] -= amt
+            rest[d] -= amt
+            v = d
+            while v != c:
+                i = nxt[v]
+                flows[i] = flows.get(i, 0.0) + amt
+                v = arcs[i][1]
+        debtors = [d for d in debtors if rest[d] > 1e-9]
+    return flows
+
+
+def greedy_settle(
+    balances: Dict[Person, float], arcs: List[PlanKey]
+) -> Dict[PlanKey, float]:
+    """
+    Fast feasible plan: each debtor (largest first) pays the nearest creditors
+    along shortest channel paths until its debt is covered.
+    """
+    warcs = _unit_arcs(arcs)
+    return expand_flows(_greedy_flows(balances, warcs), warcs)
+
+
+def _cancel_opposite(flows: Dict[int, float], arcs: List[WArc]) -> Dict[int, float]:
+    # 逆向きの流れを相殺
+    at = {(a[0], a[1]): i for i, a in enumerate(arcs)}
+    out = dict(flows)
+    for i in flows:
+        j = at.get((arcs[i][1], arcs[i][0]))
+        if j is not None and i < j and out.get(j, 0.0) > 0:
+            m = min(out[i], out[j])
+            out[i] -= m
+            out[j] -= m
+    return {i: f for i, f in out.items() if f > 1e-8}
+
 
+def _channel_arcs(
+    balances: Dict[Person, float],
+    zelle_pairs: List[Arc],
+    venmo_pairs: List[Arc],
+    objective: Sequence[str],
+    channel_costs: Optional[Dict[Channel, Dict[str, int]]],
+    pair_costs: Optional[Dict[PlanKey, Dict[str, int]]],
+) -> List[WArc]:
+    # 精算に出てこない人のペアは先に落とす (辺を作る前に)
+    zelle_pairs = [(a, b) for a, b in zelle_pairs if a in balances and b in balances]
+    venmo_pairs = [(a, b) for a, b in venmo_pairs if a in balances and b in balances]
+    arcs = mk_arcs(zelle_pairs, "zelle") + mk_arcs(venmo_pairs, "venmo")
+    if tuple(objective) == ("hops",) and not channel_costs and not pair_costs:
+        return _unit_arcs(arcs)
+    costs = lexicographic_costs(
+        arc_cost_vectors(arcs, objective, channel_costs, pair_costs), balances
+    )
+    return [(u, v, costs[(ch, u, v)], ((ch, u, v),)) for ch, u, v in arcs]
+
+
+def _build_network(
+    balances: Dict[Person, float],
+    nodes: List[Person],
+    arcs: List[WArc],
+    deadline: Optional[float] = None,
+):
+    # deadline を過ぎたら None (解かずに手持ちの計画を返す)
+    nodes = sorted(nodes)
     idx = {name: i for i, name in enumerate(nodes)}
     S = len(nodes)
     T = S + 1
     mcmf = MCMF(T + 1)
 
-    # 1ホップ=コスト1
-    for ch, u, v in arcs:
-        if u in idx and v in idx:
-            mcmf.add_edge(idx[u], idx[v], cap=1e18, cost=1.0, key=(ch, u, v))
+    for i, (u, v, cost, _) in enumerate(arcs):
+        if deadline is not None and not i & 1023 and time.perf_counter() >= deadline:
+            return None
+        mcmf.add_edge(idx[u], idx[v], cap=1e18, cost=cost, key=i)
 
     total_demand = 0.0
     for n in nodes:
@@ -141,8 +419,164 @@ def optimal_settle(
         elif b > 1e-9:  # creditor: n->T
             mcmf.add_edge(idx[n], T, cap=b, cost=0.0)
 
-    flow_map, sent = mcmf.min_cost_flow(S, T, max_f=total_demand)
-    if abs(sent - total_demand) > 1e-6:
-        raise RuntimeError("Could not send all flow")
+    return mcmf, nodes, S, T, total_demand
+
+
+def settle_arcs(
+    balances: Dict[Person, float],
+    arcs: List[WArc],
+    reduce: bool = True,
+    time_budget: Optional[float] = None,
+) -> AnytimeResult:
+    """
+    Solver core over weighted arcs. Without `time_budget` it solves exactly,
+    on the reduced graph if `reduce`. With one it returns a feasible plan
+    within `time_budget` seconds: the graph is not reduced (that pass cannot
+    stop early), and every stage after the linear-time spanning-tree start
+    plan (the greedy plan, the network build, the min-cost-flow rounds and
+    the completion of a partial flow) stops at the deadline, keeping twice
+    the start plan's time in reserve for the final completion. Only the arc
+    filtering and the start plan always run, so budgets below their time
+    (tens of milliseconds for ten thousand members) are exceeded. The cheapest plan found wins. `lower_bound` comes
+    from the dual potentials of the last shortest-path round, or is demand
+    times the cheapest arc if no round ran. Costs are in arc cost units, i.e.
+    hops for the default objective.
+    """
+    if time_budget is not None:
+        deadline = time.perf_counter() + time_budget
+
+    # 合計は0
+    if abs(sum(balances.values())) > 1e-6:
+        raise ValueError("Balances must sum to 0")
+
+    arcs = [a for a in arcs if a[0] in balances and a[1] in balances]
+    nodes = list(balances)
+    if reduce and time_budget is None:
+        # 縮約は締め切りでは止められないので厳密解のときだけ
+        nodes, arcs = reduce_graph(balances, arcs)
+
+    if time_budget is None:
+        mcmf, nodes, S, T, total_demand = _build_network(balances, nodes, arcs)
+        flow_map, sent = mcmf.min_cost_flow(S, T, max_f=total_demand)
+        if abs(sent - total_demand) > 1e-6:
+            raise RuntimeError("Could not send all flow")
+        return AnytimeResult(
+            plan=expand_flows(flow_map, arcs),
+            cost=mcmf.cost,
+            lower_bound=mcmf.cost,
+            gap=0.0,
+            optimal=True,
+        )
+
+    min_cost = min((a[2] for a in arcs), default=1.0)
+    total_demand = sum(-balances[n] for n in nodes if balances[n] < -1e-9)
+
+    # 全域木の計画 (これより先は打ち切れる) と、その所要時間から見積もる
+    # 後処理 (残りの補完・相殺・展開) の分の予備
+    t0 = time.perf_counter()
+    best = _tree_flows(balances, arcs)
+    best_cost = _flow_cost(best, arcs)
+    expand_flows(best, arcs)
+    reserve = 2 * (time.perf_counter() - t0)
+    lower_bound = total_demand * min_cost
+
+    # 残り時間の一部で最寄り債権者への貪欲計画
+    now = time.perf_counter()
+    if now + reserve < deadline:
+        greedy = _greedy_flows(
+            balances, arcs, deadline=now + 0.7 * (deadline - reserve - now)
+        )
+        if _flow_cost(greedy, arcs) < best_cost:
+            best, best_cost = greedy, _flow_cost(greedy, arcs)
+
+    net = _build_network(balances, nodes, arcs, deadline=deadline - reserve)
+    if net is not None:
+        mcmf, nodes, S, T, total_demand = net
+        flow_map, sent = mcmf.min_cost_flow(
+            S, T, max_f=total_demand, deadline=deadline - reserve
+        )
+
+        # 残りの各単位は少なくとも現在の最短路長(>=最安の1辺)かかる
+        marginal = max(mcmf.h[T] - mcmf.h[S], min_cost)
+        lower_bound = mcmf.cost + (total_demand - sent) * marginal
+
+        if abs(sent - total_demand) <= 1e-6:
+            best = flow_map
+            best_cost = lower_bound = mcmf.cost
+        elif sent > 1e-9:
+            # 途中までの最適流 + 残りを (締め切りまで) 貪欲に
+            rest: Dict[Person, float] = {}
+            for e in mcmf.g[S]:
+                rest[nodes[e.to]] = -e.cap
+            for i, n in enumerate(nodes):
+                for e in mcmf.g[i]:
+                    if e.to == T:
+                        rest[n] = e.cap
+            merged = dict(flow_map)
+            completion = _greedy_flows(rest, arcs, deadline=deadline - reserve)
+            for i, f in completion.items():
+                merged[i] = merged.get(i, 0.0) + f
+            merged = _cancel_opposite(merged, arcs)
+            if _flow_cost(merged, arcs) < best_cost:
+                best = merged
+                best_cost = _flow_cost(merged, arcs)
+
+    lower_bound = min(lower_bound, best_cost)
+    gap = best_cost - lower_bound
+    return AnytimeResult(
+        plan=expand_flows(best, arcs),
+        cost=best_cost,
+        lower_bound=lower_bound,
+        gap=gap,
+        optimal=gap <= 1e-6,
+    )
 
-    return {k: v for k, v in flow_map.items() if abs(v) > 1e-8}
+
+def anytime_settle(
+    balances: Dict[Person, float],
+    zelle_pairs: List[Arc],
+    venmo_pairs: List[Arc],
+    time_budget: float,
+    reduce: bool = True,
+    objective: Sequence[str] = ("hops",),
+    channel_costs: Optional[Dict[Channel, Dict[str, int]]] = None,
+    pair_costs: Optional[Dict[PlanKey, Dict[str, int]]] = None,
+) -> AnytimeResult:
+    """
+    Deadline-bounded settle_arcs() over the Zelle/Venmo pairs; see there for
+    how the plan, cost, lower bound and gap are obtained.
+    """
+    start = time.perf_counter()
+    arcs = _channel_arcs(
+        balances, zelle_pairs, venmo_pairs, objective, channel_costs, pair_costs
+    )
+    # 辺の準備にかかった分も予算に含める
+    time_budget = max(time_budget - (time.perf_counter() - start), 0.0)
+    return settle_arcs(balances, arcs, reduce=reduce, time_budget=time_budget)
+
+
+def optimal_settle(
+    balances: Dict[Person, float],
+    zelle_pairs: List[Arc],
+    venmo_pairs: List[Arc],
+    time_budget: Optional[float] = None,
+    reduce: bool = True,
+    objective: Sequence[str] = ("hops",),
+    channel_costs: Optional[Dict[Channel, Dict[str, int]]] = None,
+    pair_costs: Optional[Dict[PlanKey, Dict[str, int]]] = None,
+) -> Dict[PlanKey, float]:
+    """
+    Min-cost settlement over the channel graph. By default every hop costs 1;
+    `objective` lists criteria (e.g. ("hops", "fee", "pref")) that are
+    minimised lexicographically in one solve, with integer weights from
+    `channel_costs` / `pair_costs` (see arc_cost_vectors).
+    """
+    if time_budget is not None:
+        return anytime_settle(
+            balances, zelle_pairs, venmo_pairs, time_budget, reduce,
+            objective, channel_costs, pair_costs,
+        ).plan
+    arcs = _channel_arcs(
+        balances, zelle_pairs, venmo_pairs, objective, channel_costs, pair_costs
+    )
+    return settle_arcs(balances, arcs, reduce=reduce).plan
@@ -0,0 +1,158 @@
+import csv
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, TextIO
+
+from channel_topology import ChannelTopology
+from optimal_settlement import Person, PlanKey
+from plan_verify import PlanVerifier
+
+
+@dataclass
+class PlanRecord:
+    group: str
+    balances: Dict[Person, float]
+    names: Dict[Person, str]
+    plan: Dict[PlanKey, float]
+    verified: bool = True
+
+
+def make_record(
+    group: str,
+    balances: Dict[Person, float],
+    names: Dict[Person, str],
+    plan: Dict[PlanKey, float],
+    topology: Optional[ChannelTopology] = None,
+    verifier: Optional[PlanVerifier] = None,
+) -> PlanRecord:
+    # トポロジーがあれば、存在するチャネル辺だけを使っているかも確かめる
+    # (同じトポロジーで何度も作るなら verifier を使い回す)
+    report = (verifier or PlanVerifier(topology)).verify(balances, plan)
+    return PlanRecord(group, balances, names, plan, report.ok)
+
+
+def _transfers(rec: PlanRecord):
+    for (channel, sender, receiver), amount in rec.plan.items():
+        if amount > 0:
+            yield channel, sender, receiver, amount
+
+
+def record_json(rec: PlanRecord) -> Dict[str, Any]:
+    """
+    JSON-ready balances, transfers, total and verification status of a
+    record; the shape shared by JsonlWriter and the settlement server.
+    """
+    names = rec.names
+    transfers = [
+        {
+            "from_id": sender,
+            "from": names[sender],
+            "to_id": receiver,
+            "to": names[receiver],
+            "channel": channel,
+            "amount": round(amount, 2),
+        }
+        for channel, sender, receiver, amount in _transfers(rec)
+    ]
+    return {
+        "balances": [
+            {"id": mid, "name": names[mid], "balance": b}
+            for mid, b in rec.balances.items()
+        ],
+        "transfers": transfers,
+        "total": round(sum(t["amount"] for t in transfers), 2),
+        "verified": rec.verified,
+    }
+
+
+class MarkdownWriter:
+    # main() の従来の出力と同じ形式
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def write(self, rec: PlanRecord) -> None:
+        names = rec.names
+        lines = []
+        if rec.group:
+            lines.append(f"# {rec.group}")
+        lines.append("=== Simple Network-Based Settlement ===")
+        lines.append("## Balances:")
+        for mid, balance in rec.balances.items():
+            lines.append(f"- *{names[mid]}*: ${balance:.2f}")
+
+        lines.append("\n ## Settlement Plan:")
+        total_amount = 0.0
+        for channel, sender, receiver, amount in _transfers(rec):
+            lines.append(
+                f"- *{names[sender]}* → *{names[receiver]}*: ${amount:.2f} ({channel})"
+            )
+            total_amount += amount
+
+        lines.append(f"\nTotal transaction amount: ${total_amount:.2f}")
+        self.stream.write("\n".join(lines) + "\n")
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class JsonlWriter:
+    # 1グループ1行のJSON
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def write(self, rec: PlanRecord) -> None:
+        obj = {"group": rec.group, **record_json(rec)}
+        self.stream.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")))
+        self.stream.write("\n")
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class CsvWriter:
+    """
+    One row per balance, transfer and total, told apart by `kind`. The stream
+    should be opened with newline="".
+    """
+
+    HEADER = ["group", "kind", "id", "name", "to_id", "to", "channel", "amount", "verified"]
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self.csv = csv.writer(stream)
+        self.csv.writerow(self.HEADER)
+
+    def write(self, rec: PlanRecord) -> None:
+        g, names = rec.group, rec.names
+        rows = [
+            [g, "balance", mid, names[mid], "", "", "", f"{b:.2f}", ""]
+            for mid, b in rec.balances.items()
+        ]
+        total = 0.0
+        for channel, sender, receiver, amount in _transfers(rec):
+            rows.append(
+                [g, "transfer", sender, names[sender], receiver, names[receiver],
+                 channel, f"{amount:.2f}", ""]
+            )
+            total += amount
+        rows.append([g, "total", "", "", "", "", "", f"{total:.2f}", rec.verified])
+        self.csv.writerows(rows)
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+WRITERS = {"markdown": MarkdownWriter, "jsonl": JsonlWriter, "csv": CsvWriter}
+
+
+def write_plans(records: Iterable[PlanRecord], writer) -> int:
+    """
+    Streams records (e.g. a generator over many groups) to `writer` one at a
+    time, so batch runs never hold all plans in memory. Returns the count.
+    """
+    n = 0
+    for rec in records:
+        writer.write(rec)
+        n += 1
+    writer.close()
+    return n
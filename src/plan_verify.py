@@ -0,0 +1,187 @@
+import heapq
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from channel_topology import ChannelTopology
+from optimal_settlement import Person, PlanKey
+
+
+class IncidenceMatrix:
+    """
+    Sparse node-arc incidence matrix: column j has -1 at its tail and +1 at
+    its head, so A @ x gives every node's net amount received under the arc
+    flows x. Stored as the two index arrays (two non-zeros per column).
+    """
+
+    def __init__(self, n_nodes: int, tails: Sequence[int], heads: Sequence[int]):
+        self.n_nodes = n_nodes
+        self.tails = tails
+        self.heads = heads
+
+    def matvec(self, x: Sequence[float]) -> List[float]:
+        y = [0.0] * self.n_nodes
+        for t, h, v in zip(self.tails, self.heads, x):
+            if v:
+                y[t] -= v
+                y[h] += v
+        return y
+
+
+# (非ゼロの (辺番号, 流量), 範囲外の送金の純額, 負の送金, 無効な送金)
+_Scan = Tuple[
+    List[Tuple[int, float]], Dict[Person, float], List[Tuple[PlanKey, float]], List[PlanKey]
+]
+
+
+@dataclass
+class VerifyReport:
+    ok: bool
+    max_residual: float
+    # 残差 (受取額 - 残高) の大きい順
+    worst: List[Tuple[Person, float]] = field(default_factory=list)
+    negative: List[Tuple[PlanKey, float]] = field(default_factory=list)
+    invalid: List[PlanKey] = field(default_factory=list)
+
+
+class PlanVerifier:
+    """
+    Checks plans for flow conservation, non-negative amounts, that every
+    transfer is between people in the balances and (given a topology) that
+    it uses an existing channel arc. The incidence matrix is built once, so
+    verifying many plans only costs one sparse product each, or a single
+    product for a whole batch with verify_many().
+    """
+
+    def __init__(self, topology: Optional[ChannelTopology] = None) -> None:
+        self.topology = topology
+        if topology is not None:
+            self.col = {k: j for j, k in enumerate(topology.keys)}
+            self.A = IncidenceMatrix(len(topology.names), topology.tails, topology.heads)
+
+    def _scan(
+        self,
+        balances: Dict[Person, float],
+        plan: Dict[PlanKey, float],
+        col: Dict[PlanKey, int],
+        tol: float,
+    ) -> _Scan:
+        entries: List[Tuple[int, float]] = []
+        outside: Dict[Person, float] = {}
+        negative: List[Tuple[PlanKey, float]] = []
+        invalid: List[PlanKey] = []
+        for k, f in plan.items():
+            if f < -tol:
+                negative.append((k, f))
+            j = col.get(k)
+            if j is None or k[1] not in balances or k[2] not in balances:
+                # 存在しないチャネル辺か、精算の対象外の人との送金
+                invalid.append(k)
+            if j is None:
+                # 保存則には数える
+                outside[k[1]] = outside.get(k[1], 0.0) - f
+                outside[k[2]] = outside.get(k[2], 0.0) + f
+            else:
+                entries.append((j, f))
+        return entries, outside, negative, invalid
+
+    def _report(
+        self,
+        balances: Dict[Person, float],
+        row: Dict[Person, int],
+        y: Sequence[float],
+        base: int,
+        scan: _Scan,
+        tol: float,
+        top: int,
+    ) -> VerifyReport:
+        _, outside, negative, invalid = scan
+        residual = {p: y[base + i] - balances.get(p, 0.0) for p, i in row.items()}
+        for p, b in balances.items():
+            if p not in row:
+                residual[p] = -b
+        for p, f in outside.items():
+            residual[p] = residual.get(p, -balances.get(p, 0.0)) + f
+
+        worst = heapq.nlargest(top, residual.items(), key=lambda kv: abs(kv[1]))
+        max_residual = abs(worst[0][1]) if worst else 0.0
+        return VerifyReport(
+            ok=max_residual <= tol and not negative and not invalid,
+            max_residual=max_residual,
+            worst=[(p, r) for p, r in worst if abs(r) > tol],
+            negative=negative,
+            invalid=invalid,
+        )
+
+    def verify(
+        self,
+        balances: Dict[Person, float],
+        plan: Dict[PlanKey, float],
+        tol: float = 1e-6,
+        top: int = 3,
+    ) -> VerifyReport:
+        if self.topology is not None:
+            row, col, A = self.topology.ids, self.col, self.A
+        else:
+            # トポロジーなし: 計画に出てくる辺だけで行列を作る
+            names = list(dict.fromkeys(p for _, u, v in plan for p in (u, v)))
+            row = {p: i for i, p in enumerate(names)}
+            col = {k: j for j, k in enumerate(plan)}
+            A = IncidenceMatrix(
+                len(names),
+                array("q", (row[u] for _, u, _ in plan)),
+                array("q", (row[v] for _, _, v in plan)),
+            )
+
+        scan = self._scan(balances, plan, col, tol)
+        x = [0.0] * len(col)
+        for j, f in scan[0]:
+            x[j] += f
+        return self._report(balances, row, A.matvec(x), 0, scan, tol, top)
+
+    def verify_many(
+        self,
+        items: Iterable[Tuple[Dict[Person, float], Dict[PlanKey, float]]],
+        tol: float = 1e-6,
+        top: int = 3,
+    ) -> List[VerifyReport]:
+        """
+        One report per (balances, plan) pair. With a topology the whole batch
+        is one product: plan i's flows are stacked into one sparse vector over
+        a block-diagonal copy of the incidence arrays (rows offset by i times
+        the node count), so only the transfers actually made are touched
+        instead of every arc once per plan.
+        """
+        if self.topology is None:
+            return [self.verify(b, plan, tol=tol, top=top) for b, plan in items]
+
+        n = len(self.topology.names)
+        tails, heads = self.A.tails, self.A.heads
+        balances_list: List[Dict[Person, float]] = []
+        scans: List[_Scan] = []
+        st, sh, x = array("q"), array("q"), array("d")
+        for i, (balances, plan) in enumerate(items):
+            scan = self._scan(balances, plan, self.col, tol)
+            base = i * n
+            for j, f in scan[0]:
+                st.append(tails[j] + base)
+                sh.append(heads[j] + base)
+                x.append(f)
+            balances_list.append(balances)
+            scans.append(scan)
+
+        y = IncidenceMatrix(n * len(scans), st, sh).matvec(x)
+        row = self.topology.ids
+        return [
+            self._report(b, row, y, i * n, scan, tol, top)
+            for i, (b, scan) in enumerate(zip(balances_list, scans))
+        ]
+
+
+def verify_plan(
+    balances: Dict[Person, float],
+    plan: Dict[PlanKey, float],
+    topology: Optional[ChannelTopology] = None,
+    tol: float = 1e-6,
+) -> VerifyReport:
+    return PlanVerifier(topology).verify(balances, plan, tol=tol)
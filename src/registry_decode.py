@@ -0,0 +1,279 @@
+import json
+import re
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Member:
+    __slots__ = ("id", "display_name", "name")
+
+    def __init__(self, id: int, display_name: str, name: str) -> None:
+        self.id = id
+        self.display_name = display_name
+        self.name = name  # alias.pointer.name
+
+
+class Entry:
+    """
+    One registry entry. `owner` is the paying membership id (None if the
+    payer is not a non-user membership); the allocations are packed into two
+    parallel arrays.
+    """
+
+    __slots__ = (
+        "id", "date", "type", "amount", "currency", "owner", "alloc_ids", "alloc_amounts"
+    )
+
+    def __init__(
+        self,
+        id: Optional[int],
+        date: str,
+        type: str,
+        amount: float,
+        currency: str,
+        owner: Optional[int],
+        alloc_ids: array,
+        alloc_amounts: array,
+    ) -> None:
+        self.id = id
+        self.date = date
+        self.type = type
+        self.amount = amount
+        self.currency = currency
+        self.owner = owner
+        self.alloc_ids = alloc_ids
+        self.alloc_amounts = alloc_amounts
+
+
+class Registry:
+    __slots__ = ("members", "entries", "currency", "memberships")
+
+    def __init__(
+        self,
+        members: Dict[int, Member],
+        entries: List[Entry],
+        currency: str = "",
+        memberships: Optional[List[int]] = None,
+    ) -> None:
+        # 登録順 (memberships の後に、エントリにしか出てこない人)
+        self.members = members
+        self.entries = entries
+        self.currency = currency
+        # memberships に載っている人の id (エントリにしか出てこない人は除く)
+        self.memberships = list(members) if memberships is None else memberships
+
+    def names(self) -> Dict[int, str]:
+        return {mid: m.display_name for mid, m in self.members.items()}
+
+
+def _fail(path: str) -> ValueError:
+    return ValueError(f"Malformed registry: {path} is missing or malformed")
+
+
+class _Builder:
+    # メンバーとエントリを1件ずつ積み上げる (dict からでもストリームからでも)
+    def __init__(self) -> None:
+        self.members: Dict[int, Member] = {}
+        self.listed: List[int] = []
+        self.entries: List[Entry] = []
+        self.currency = ""
+
+    def member(self, wrap: Dict[str, Any]) -> Optional[int]:
+        # エントリ内のメンバーは毎回同じものの複製: id で引いて残りは読まない
+        rm = wrap.get("RegistryMembershipNonUser")
+        if not rm:
+            return None
+        mid = rm["id"]
+        if mid not in self.members:
+            alias = rm["alias"]
+            pointer = alias.get("pointer") or {}
+            self.members[mid] = Member(
+                int(mid), alias["display_name"], pointer.get("name", "")
+            )
+        return mid
+
+    def membership(self, wrap: Dict[str, Any]) -> None:
+        mid = self.member(wrap)
+        if mid is not None:
+            self.listed.append(mid)
+
+    def entry(self, ewrap: Dict[str, Any]) -> None:
+        e = ewrap.get("RegistryEntry")
+        if not e:
+            return
+        amount = e["amount"]
+        mo = e.get("membership_owned")
+        owner = self.member(mo) if mo else None
+
+        ids = []
+        amounts = []
+        for alloc in e.get("allocations", ()):
+            a_amt = float(alloc["amount"]["value"])
+            mem = alloc.get("membership")
+            rm = mem.get("RegistryMembershipNonUser") if mem else None
+            if rm:
+                mid = rm["id"]
+                if mid not in self.members:
+                    self.member(mem)
+                ids.append(mid)
+                amounts.append(a_amt)
+
+        self.entries.append(
+            Entry(
+                e.get("id"),
+                e.get("date") or "",
+                e.get("type_transaction", ""),
+                float(amount["value"]),
+                amount.get("currency", ""),
+                owner,
+                array("q", ids),
+                array("d", amounts),
+            )
+        )
+
+    def registry(self) -> Registry:
+        # memberships が後ろにあっても、登録順は memberships が先
+        members = {mid: self.members[mid] for mid in self.listed}
+        members.update(self.members)
+        return Registry(members, self.entries, self.currency, self.listed)
+
+
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class _Stream:
+    """
+    Minimal pull reader over JSON text. Containers are walked one member at
+    a time and only the values asked for are decoded, so the whole document
+    is never materialised as Python objects.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.s = text
+        self.i = 0
+
+    def peek(self) -> str:
+        self.i = _WS.match(self.s, self.i).end()
+        return self.s[self.i : self.i + 1]
+
+    def _expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise json.JSONDecodeError(f"Expecting '{ch}'", self.s, self.i)
+        self.i += 1
+
+    def value(self) -> Any:
+        # 次の値を丸ごと読む (読み飛ばすときも)
+        self.peek()
+        v, self.i = _DECODER.raw_decode(self.s, self.i)
+        return v
+
+    def _walk(self, open_: str, close: str, keyed: bool) -> Iterator[Any]:
+        # 呼び出し側は yield ごとに値をちょうど1つ読むこと
+        self._expect(open_)
+        if self.peek() == close:
+            self.i += 1
+            return
+        n = 0
+        while True:
+            if keyed:
+                key = self.value()
+                self._expect(":")
+                yield key
+            else:
+                yield n
+                n += 1
+            c = self.peek()
+            self.i += 1
+            if c == close:
+                return
+            if c != ",":
+                raise json.JSONDecodeError(f"Expecting ',' or '{close}'", self.s, self.i - 1)
+
+    def keys(self) -> Iterator[str]:
+        return self._walk("{", "}", True)
+
+    def items(self) -> Iterator[int]:
+        return self._walk("[", "]", False)
+
+
+def _decode_stream(text: str) -> Registry:
+    st = _Stream(text)
+
+    def find(key: str) -> bool:
+        # オブジェクトを key まで読み進める (他の値は読み飛ばす)
+        if st.peek() != "{":
+            return False
+        for k in st.keys():
+            if k == key:
+                return True
+            st.value()
+        return False
+
+    b = _Builder()
+    if not (find("Response") and st.peek() == "[" and next(st.items(), None) == 0):
+        raise _fail("Response[0].Registry")
+    if not find("Registry") or st.peek() != "{":
+        raise _fail("Response[0].Registry")
+
+    # 失敗時のエラーメッセージ用の位置
+    section, i = "memberships", 0
+    try:
+        for key in st.keys():
+            if key == "memberships":
+                section = key
+                for i in st.items():
+                    b.membership(st.value())
+            elif key == "all_registry_entry":
+                section = key
+                for i in st.items():
+                    b.entry(st.value())
+            elif key == "currency":
+                b.currency = st.value() or ""
+            else:
+                st.value()
+    except json.JSONDecodeError:
+        raise
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        raise _fail(f"{section}[{i}]") from None
+    # Registry の後ろ (残りの応答) は使わない
+    return b.registry()
+
+
+def decode_registry(data: Any) -> Registry:
+    """
+    Decodes a registry response into slotted records in a single pass,
+    validating the fields it reads. `data` may be the parsed JSON dict, raw
+    JSON (str/bytes), a path to a JSON file or an already decoded Registry.
+    Raw JSON is read one entry at a time without building the whole
+    document, which keeps peak memory close to the size of the records.
+    """
+    if isinstance(data, Registry):
+        return data
+    if isinstance(data, str) and not data.lstrip().startswith("{"):
+        with open(data, "rb") as f:
+            data = f.read()
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode(json.detect_encoding(data), "surrogatepass")
+    if isinstance(data, str):
+        return _decode_stream(data)
+
+    try:
+        reg = data["Response"][0]["Registry"]
+    except (KeyError, IndexError, TypeError):
+        raise _fail("Response[0].Registry") from None
+
+    b = _Builder()
+    # 失敗時のエラーメッセージ用の位置
+    section, i = "memberships", 0
+    try:
+        for i, mm in enumerate(reg.get("memberships", ())):
+            b.membership(mm)
+
+        section = "all_registry_entry"
+        for i, ewrap in enumerate(reg.get("all_registry_entry", ())):
+            b.entry(ewrap)
+        b.currency = reg.get("currency") or ""
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        raise _fail(f"{section}[{i}]") from None
+    return b.registry()
@@ -0,0 +1,89 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from channel_topology import ChannelTopology
+from optimal_settlement import Arc, Channel, Person
+
+# channel -> pairs, e.g. {"zelle": [...], "venmo": [...]}
+Scenario = Dict[Channel, List[Arc]]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    feasible: bool
+    volume: float  # 送金総額 (=1ホップ1コストの目的関数値)
+    transfers: int
+    hops: float  # 借りている1ドルあたりの平均ホップ数
+    error: str = ""
+
+
+# ワーカーごとに一度だけ受け取る読み取り専用の残高
+_BALANCES: Dict[Person, float] = {}
+
+
+def _init_worker(balances: Dict[Person, float]) -> None:
+    global _BALANCES
+    _BALANCES = balances
+
+
+def _solve(task: Tuple[str, Scenario]) -> ScenarioResult:
+    name, channels = task
+    try:
+        plan = ChannelTopology(channels).settle(_BALANCES)
+    except RuntimeError as e:
+        return ScenarioResult(name, False, 0.0, 0, 0.0, str(e))
+    volume = sum(plan.values())
+    owed = sum(-b for b in _BALANCES.values() if b < 0)
+    return ScenarioResult(
+        name,
+        True,
+        round(volume, 2),
+        len(plan),
+        round(volume / owed, 3) if owed > 0 else 0.0,
+    )
+
+
+def add_pairs(base: Scenario, channel: Channel, pairs: List[Arc]) -> Scenario:
+    # 例: "X が Venmo を始めたら"
+    out = {ch: list(p) for ch, p in base.items()}
+    out.setdefault(channel, []).extend(pairs)
+    return out
+
+
+def sweep(
+    balances: Dict[Person, float],
+    scenarios: Dict[str, Scenario],
+    max_workers: Optional[int] = None,
+) -> List[ScenarioResult]:
+    """
+    Settles one balance vector under many channel topologies in parallel.
+    The balances go to each worker once (not once per task). Results are
+    ranked: feasible first, then by volume moved, then by number of transfers.
+    """
+    tasks = list(scenarios.items())
+    if max_workers == 1 or len(tasks) <= 1:
+        _init_worker(balances)
+        results = [_solve(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(balances,)
+        ) as pool:
+            results = list(pool.map(_solve, tasks))
+    return sorted(results, key=lambda r: (not r.feasible, r.volume, r.transfers))
+
+
+def format_table(results: List[ScenarioResult]) -> str:
+    lines = [
+        "| # | scenario | volume | transfers | hops/$ |",
+        "|---|---|---|---|---|",
+    ]
+    for i, r in enumerate(results, 1):
+        if r.feasible:
+            lines.append(
+                f"| {i} | {r.name} | ${r.volume:.2f} | {r.transfers} | {r.hops:.3f} |"
+            )
+        else:
+            lines.append(f"| {i} | {r.name} | infeasible | - | - |")
+    return "\n".join(lines)
@@ -0,0 +1,103 @@
+"""
+Offline settlement: reads a saved Tricount registry JSON from a file or stdin
+and prints the settlement plan. Nothing network- or crypto-related is
+imported, so it starts fast enough to be called from shell pipelines.
+
+    uv run python src/settle_cli.py registry.json
+    cat registry.json | uv run python src/settle_cli.py -
+    uv run python src/settle_cli.py --format jsonl groups/*.json
+    uv run python src/settle_cli.py --consolidate groups/*.json
+    uv run python src/settle_cli.py --currency USD --fx-rates rates.json trip.json
+"""
+
+import argparse
+import os
+import sys
+
+from consolidate import (
+    IdentityMap,
+    consolidate,
+    consolidated_topology,
+    settle_consolidated,
+)
+from fx_rates import load_fx_table
+from main import CHANNELS_FILE, settle_data
+from plan_export import WRITERS, make_record, write_plans
+
+
+def _read(path):
+    # raw JSON: the decoder parses it and keeps only the fields it needs
+    if path == "-":
+        return sys.stdin.buffer.read()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _label(path):
+    # ファイル名だけだと a/trip.json と b/trip.json がぶつかる
+    return path if path == "-" else os.path.normpath(path)
+
+
+def _records(paths, channels, time_budget, currency=None, fx=None):
+    # 1件ずつ読んで解いて渡す (全件をメモリに持たない)
+    for path in paths:
+        data = _read(path)
+        balances, names, plan, topology = settle_data(
+            data, channels_file=channels, time_budget=time_budget,
+            currency=currency, fx=fx,
+        )
+        group = "" if len(paths) == 1 else _label(path)
+        yield make_record(group, balances, names, plan, topology)
+
+
+def _consolidated(paths, channels, time_budget, identities, currency=None, fx=None):
+    identity = IdentityMap.from_file(identities) if identities else IdentityMap()
+    cons = consolidate(
+        ((_label(p), _read(p)) for p in paths),
+        identity=identity, currency=currency, fx=fx,
+    )
+    topology = consolidated_topology(channels, identity)
+    plan = settle_consolidated(cons, time_budget=time_budget, topology=topology)
+    yield make_record("consolidated", cons.balances, cons.names, plan, topology)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "registry", nargs="*", default=["-"], help="registry JSON files, or - for stdin"
+    )
+    parser.add_argument("--channels", default=CHANNELS_FILE, help="channel config")
+    parser.add_argument(
+        "--time-budget", type=float, default=None, help="seconds (anytime solve)"
+    )
+    parser.add_argument("--format", choices=sorted(WRITERS), default="markdown")
+    parser.add_argument(
+        "--consolidate", action="store_true", help="settle all registries as one"
+    )
+    parser.add_argument("--identities", default=None, help="member identity map JSON")
+    parser.add_argument(
+        "--currency", default=None, help="settlement currency (default: the registry's)"
+    )
+    parser.add_argument("--fx-rates", default=None, help="date-keyed FX rate table JSON")
+    args = parser.parse_args(argv)
+    fx = load_fx_table(args.fx_rates) if args.fx_rates else None
+
+    out = open(
+        sys.stdout.fileno(), "w", buffering=1 << 16, encoding="utf-8",
+        newline="", closefd=False,
+    )
+    if args.consolidate:
+        records = _consolidated(
+            args.registry, args.channels, args.time_budget, args.identities,
+            args.currency, fx,
+        )
+    else:
+        records = _records(
+            args.registry, args.channels, args.time_budget, args.currency, fx
+        )
+    write_plans(records, WRITERS[args.format](out))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
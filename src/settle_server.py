@@ -0,0 +1,270 @@
+"""
+Long-running local settlement service. Keeps authenticated TricountAPI
+sessions, parsed registries and compiled channel graphs in memory, so a
+request only pays for the solve.
+
+    uv run python src/settle_server.py --port 8765
+    uv run python src/settle_server.py --unix /tmp/settle.sock
+
+POST /settle  {"key": "...", "time_budget": 0.05}  -> plan as JSON
+POST /refresh {"key": "..."}                        -> re-fetch the registry
+GET  /health
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from channel_topology import ChannelTopology
+from main import CHANNELS_FILE, member_topology
+from plan_export import make_record, record_json
+from plan_verify import PlanVerifier
+from tricount_read import get_net_by_member
+
+
+def _tricount_api(key: str):
+    from tricount_api import TricountAPI
+
+    return TricountAPI(tricount_key=key)
+
+
+class _Registry:
+    # 1レジストリ分の温めた状態
+    __slots__ = (
+        "api", "balances", "names", "topology", "verifier", "lock", "fetch_lock"
+    )
+
+    def __init__(self) -> None:
+        self.api: Any = None
+        self.balances: Dict[int, float] = {}
+        self.names: Dict[int, str] = {}
+        self.topology: Optional[ChannelTopology] = None
+        self.verifier: Optional[PlanVerifier] = None
+        # lock: 状態の差し替え用 / fetch_lock: APIセッションの利用を直列化
+        self.lock = threading.Lock()
+        self.fetch_lock = threading.Lock()
+
+
+class SettlementService:
+    """
+    Warm state shared by all request handlers. `api_factory(key)` returns an
+    authenticated client with get_registry()/update_data() (TricountAPI by default).
+    """
+
+    def __init__(
+        self,
+        channels_file: str = CHANNELS_FILE,
+        api_factory: Callable[[str], Any] = _tricount_api,
+        default_key: Optional[str] = None,
+    ) -> None:
+        self.channels_file = channels_file
+        self.api_factory = api_factory
+        self.default_key = default_key
+        self.registries: Dict[str, _Registry] = {}
+        self.lock = threading.Lock()
+
+    def _registry(self, key: Optional[str]) -> Tuple[_Registry, bool]:
+        # (状態, 今回初めて読み込んだか)
+        key = key or self.default_key
+        if not key:
+            raise ValueError("No tricount key given")
+        with self.lock:
+            reg = self.registries.get(key)
+            if reg is None:
+                reg = self.registries[key] = _Registry()
+        with reg.lock:
+            if reg.topology is not None:
+                # 読み込み済み: fetch_lock には触らない (refresh 中も待たない)
+                return reg, False
+        with reg.fetch_lock:
+            if reg.api is not None:
+                return reg, False
+            # 初回だけ認証と取得 (失敗したら次のリクエストでやり直す)
+            api = self.api_factory(key)
+            self._load(reg, api)
+            reg.api = api
+        return reg, True
+
+    def _load(self, reg: _Registry, api: Any) -> None:
+        balances, names = get_net_by_member(api.get_registry())
+        topology = member_topology(names, self.channels_file)
+        verifier = PlanVerifier(topology)
+        with reg.lock:
+            reg.balances, reg.names, reg.topology = balances, names, topology
+            reg.verifier = verifier
+
+    def refresh(self, key: Optional[str] = None) -> Dict[str, Any]:
+        reg, fresh = self._registry(key)
+        if not fresh:
+            # 取得中も settle は古い状態で答え続ける
+            with reg.fetch_lock:
+                reg.api.update_data()
+                self._load(reg, reg.api)
+        return {"members": len(reg.names)}
+
+    def settle(
+        self, key: Optional[str] = None, time_budget: Optional[float] = None
+    ) -> Dict[str, Any]:
+        reg, _ = self._registry(key)
+        # 参照をまとめて取る (refresh と競合しても一貫した組になる)
+        with reg.lock:
+            balances, names = reg.balances, reg.names
+            topology, verifier = reg.topology, reg.verifier
+        result = topology.solve(balances, time_budget=time_budget)
+
+        # JSON Lines 出力と同じ形 (検証結果つき) に、anytime の情報を足す
+        rec = make_record("", balances, names, result.plan, verifier=verifier)
+        return {**record_json(rec), "optimal": result.optimal, "gap": result.gap}
+
+
+def _time_budget(body: Dict[str, Any]) -> Optional[float]:
+    # 秒数 (0以上の数) か、なし
+    budget = body.get("time_budget")
+    if budget is None:
+        return None
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or not budget >= 0:
+        raise ValueError("time_budget must be a non-negative number")
+    return float(budget)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "PooledHTTPServer"
+
+    def address_string(self) -> str:
+        # Unixソケットでは client_address が文字列
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _reply(self, status: int, body: Dict[str, Any]) -> None:
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            service = self.server.service
+            if self.path == "/settle":
+                out = service.settle(body.get("key"), _time_budget(body))
+            elif self.path == "/refresh":
+                out = service.refresh(body.get("key"))
+            else:
+                self._reply(404, {"error": "not found"})
+                return
+        except (ValueError, RuntimeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # 取得失敗など: 接続を切らずにJSONで返す
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._reply(200, out)
+
+
+class _PoolMixIn:
+    # リクエストをスレッドプールで処理する (ThreadingMixIn の代わり)
+    def init_pool(self, service: SettlementService, workers: int, quiet: bool):
+        self.service = service
+        self.quiet = quiet
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class PooledHTTPServer(_PoolMixIn, HTTPServer):
+    pass
+
+
+class PooledUnixHTTPServer(_PoolMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+def make_server(
+    service: SettlementService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_path: Optional[str] = None,
+    workers: int = 4,
+    quiet: bool = False,
+):
+    if unix_path:
+        # 前回のソケットだけ消す (パスの打ち間違いで普通のファイルを消さない)
+        try:
+            mode = os.stat(unix_path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise ValueError(f"Not a socket, refusing to replace: {unix_path}")
+            os.unlink(unix_path)
+        server = PooledUnixHTTPServer(unix_path, _Handler)
+    else:
+        server = PooledHTTPServer((host, port), _Handler)
+    server.init_pool(service, workers, quiet)
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local settlement service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="serve on a Unix socket")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--channels", default=CHANNELS_FILE, help="channel config")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    service = SettlementService(
+        channels_file=args.channels, default_key=os.environ.get("TRICOUNT_KEY")
+    )
+    server = make_server(service, args.host, args.port, args.unix, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import os
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from channel_topology import ChannelTopology
+from optimal_settlement import AnytimeResult, Person, PlanKey
+
+# 1タスクで渡すもの: 非ゼロ残高の (id配列, 金額配列)
+Delta = Tuple[array, array]
+
+
+class SharedTopology:
+    """
+    Puts a compiled topology's arc arrays (tails, heads and, for weighted
+    objectives, the int64 cost vectors) into shared memory segments. Workers
+    attach to them by name instead of receiving pickled copies; `spec` is the
+    only thing they need. Use as a context manager so the segments are freed.
+    """
+
+    def __init__(self, topology: ChannelTopology) -> None:
+        self.topology = topology
+        self.segments: List[SharedMemory] = []
+        n_crit = len(topology.vectors[0]) if topology.vectors else 0
+        flat = None
+        if topology.vectors:
+            try:
+                flat = array("q", (c for vec in topology.vectors for c in vec))
+            except OverflowError:
+                raise ValueError("Cost weights do not fit in int64") from None
+
+        self.spec: Dict[str, Any] = {
+            "n_nodes": topology.n_nodes,
+            "n_crit": n_crit,
+            "tails": self._share(array("q", topology.tails)),
+            "heads": self._share(array("q", topology.heads)),
+            "vectors": self._share(flat) if flat is not None else None,
+        }
+
+    def _share(self, arr: array) -> str:
+        shm = SharedMemory(create=True, size=max(arr.itemsize * len(arr), 1))
+        shm.buf[: arr.itemsize * len(arr)] = arr.tobytes()
+        self.segments.append(shm)
+        return shm.name
+
+    def close(self) -> None:
+        for shm in self.segments:
+            shm.close()
+            shm.unlink()
+        self.segments = []
+
+    def __enter__(self) -> "SharedTopology":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ワーカー側の状態
+_TOPOLOGY: Optional[ChannelTopology] = None
+# ビューが生きている間は SharedMemory も保持する (ワーカー終了時にOSが解放)
+_ATTACHED: List[SharedMemory] = []
+
+# 1タスクの結果: (辺番号配列, 流量配列, cost, lower_bound, gap, optimal)
+Solved = Tuple[array, array, float, float, float, bool]
+
+
+def _attach(name: str, n: int, fmt: str) -> memoryview:
+    # track=False: 後始末は作った側 (SharedTopology) が行う
+    shm = SharedMemory(name=name, track=False)
+    _ATTACHED.append(shm)
+    return shm.buf[: n * 8].cast(fmt)
+
+
+def _init_worker(spec: Dict[str, Any], n_arcs: int) -> None:
+    global _TOPOLOGY
+    tails = _attach(spec["tails"], n_arcs, "q")
+    heads = _attach(spec["heads"], n_arcs, "q")
+    vectors = None
+    if spec["vectors"]:
+        k = spec["n_crit"]
+        flat = _attach(spec["vectors"], n_arcs * k, "q")
+        vectors = [flat[i * k : (i + 1) * k] for i in range(n_arcs)]
+    _TOPOLOGY = ChannelTopology.from_arrays(spec["n_nodes"], tails, heads, vectors)
+
+
+def _solve(tasks: List[Delta], time_budget: Optional[float]) -> List[Solved]:
+    out = []
+    for ids, amounts in tasks:
+        r = _TOPOLOGY.solve_ids(dict(zip(ids, amounts)), time_budget=time_budget)
+        out.append(
+            (
+                array("q", r.plan.keys()),
+                array("d", r.plan.values()),
+                r.cost,
+                r.lower_bound,
+                r.gap,
+                r.optimal,
+            )
+        )
+    return out
+
+
+def _delta(topology: ChannelTopology, balances: Dict[Person, float]) -> Delta:
+    ids = array("q")
+    amounts = array("d")
+    extra = topology.n_nodes
+    for name, b in balances.items():
+        i = topology.ids.get(name)
+        if i is None:
+            # どのチャネルにもいない人
+            i = extra
+            extra += 1
+        if b or i >= topology.n_nodes:
+            ids.append(i)
+            amounts.append(b)
+    return ids, amounts
+
+
+def parallel_solve(
+    topology: ChannelTopology,
+    balance_vectors: Iterable[Dict[Person, float]],
+    max_workers: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    chunksize: int = 8,
+) -> Iterator[AnytimeResult]:
+    """
+    Settles many balance vectors against one topology in worker processes.
+    The topology arrays are shared once through shared memory; each task only
+    carries its non-zero balances and returns (arc index, amount) arrays.
+    Input is consumed lazily, a few chunks per worker ahead of the results,
+    and results (with their anytime gap) are yielded in input order.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    vectors = iter(balance_vectors)
+    with SharedTopology(topology) as shared:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared.spec, len(topology.tails)),
+        ) as pool:
+            pending: Deque[Future] = deque()
+
+            def submit() -> bool:
+                chunk = [_delta(topology, b) for b in islice(vectors, chunksize)]
+                if chunk:
+                    pending.append(pool.submit(_solve, chunk, time_budget))
+                return bool(chunk)
+
+            # 同時に投げるのはワーカーあたり2チャンクまで
+            while len(pending) < 2 * workers and submit():
+                pass
+            while pending:
+                solved = pending.popleft().result()
+                submit()
+                for idx, flows, cost, lower_bound, gap, optimal in solved:
+                    plan = {topology.keys[i]: f for i, f in zip(idx, flows)}
+                    yield AnytimeResult(plan, cost, lower_bound, gap, optimal)
+
+
+def parallel_settle(
+    topology: ChannelTopology,
+    balance_vectors: Iterable[Dict[Person, float]],
+    max_workers: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    chunksize: int = 8,
+) -> Iterator[Dict[PlanKey, float]]:
+    # 計画だけ (最適かどうかは parallel_solve で)
+    for result in parallel_solve(
+        topology, balance_vectors, max_workers, time_budget, chunksize
+    ):
+        yield result.plan
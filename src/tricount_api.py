@@ -1,4 +1,5 @@
 import json
+import os
 import requests
 import uuid
 from cryptography.hazmat.primitives.asymmetric import rsa
@@ -6,10 +7,17 @@ from cryptography.hazmat.primitives import serialization
 
 import warnings
 
+from registry_decode import Registry, decode_registry
+
+DEFAULT_BASE_URL = "https://api.tricount.bunq.com"
+
 
 class TricountAPI:
-    def __init__(self, tricount_key: str, app_id="") -> None:
-        self.base_url = "https://api.tricount.bunq.com"
+    def __init__(self, tricount_key: str, app_id="", base_url=None) -> None:
+        # e.g. a local mock server (src/mock_tricount.py) via TRICOUNT_BASE_URL
+        self.base_url = (
+            base_url or os.environ.get("TRICOUNT_BASE_URL") or DEFAULT_BASE_URL
+        ).rstrip("/")
         self.app_installation_id = self.__generate_installation_id(app_id)
         self.rsa_public_key_pem = self.__generate_rsa_key()
         self.tricount_key = tricount_key
@@ -21,8 +29,9 @@ class TricountAPI:
         self.user_id = None
         self.authenticated = False
 
-        # load the tricount data at init
-        self.data = self.__requests_json()
+        # load the tricount data at init (kept as the raw response body)
+        self._raw = self.__requests_raw()
+        self._registry = None
 
     def __generate_installation_id(self, app_id: str) -> str:
         if app_id:
@@ -76,7 +85,7 @@ class TricountAPI:
 
         return response.json()
 
-    def __requests_json(self) -> dict:
+    def __requests_raw(self) -> bytes:
         # Only authenticate if not already done
         if not self.authenticated:
             # Make authentification requests to have auth token and user ID
@@ -101,9 +110,12 @@ class TricountAPI:
             elif "Error" in auth_response:
                 error_msg = auth_response["Error"][0]["error_description"]
                 if "Superfluous authentication" in error_msg:
-                    # This shouldn't happen on first call
-                    # print("Already authenticated on first call - unexpected!")
-                    return {"registry": []}
+                    # This shouldn't happen on first call: there is no token
+                    # to fetch the registry with
+                    raise ValueError(
+                        f"Authentication failed: server reports an existing session "
+                        f"but no token was received ({error_msg})"
+                    )
                 else:
                     raise ValueError(f"Authentication failed: {error_msg}")
             else:
@@ -118,37 +130,53 @@ class TricountAPI:
             f"{self.base_url}/v1/user/{self.user_id}/registry?public_identifier_token={self.tricount_key}"
         )
 
-        return tricount_data.json()
+        return tricount_data.content
 
     def update_data(self) -> None:
         """
         Requests to tricount API and update the current data
         """
 
-        self.data = self.__requests_json()
+        self._raw = self.__requests_raw()
+        self._registry = None
+
+    @property
+    def data(self) -> dict:
+        """
+        The raw json data as a dict, parsed from the response body on every
+        access (only the body is kept in memory)
+        """
+
+        return json.loads(self._raw)
 
     def get_data(self) -> dict:
         """
-        Returns a dict containing the raw json data from tricount API
+        Returns a dict containing the raw json data from tricount API. Only
+        the response body is kept, so it is parsed again on every call; use
+        get_registry() for the decoded records.
         """
 
-        return self.data
+        return json.loads(self._raw)
 
-    def get_users(self) -> dict:
+    def get_registry(self) -> Registry:
         """
-        Returns a dict with user IDs as key and user names as value
+        Returns the current data decoded into typed records, straight from
+        the response body (cached until the next update_data())
         """
 
-        users = {}
+        if self._registry is None:
+            self._registry = decode_registry(self._raw)
 
-        for user in self.data["Response"][0]["Registry"]["memberships"]:
-            entry = user["RegistryMembershipNonUser"]
-            id = str(entry["id"])
-            name = entry["alias"]["pointer"]["name"]
+        return self._registry
 
-            users[id] = name
+    def get_users(self) -> dict:
+        """
+        Returns a dict with user IDs as key and user names as value (members
+        listed in the registry's memberships)
+        """
 
-        return users
+        registry = self.get_registry()
+        return {str(mid): registry.members[mid].name for mid in registry.memberships}
 
     def get_expenses(self, user_id=None) -> list:
         """
@@ -157,22 +185,19 @@ class TricountAPI:
 
         expenses = []
 
-        for expense in self.data["Response"][0]["Registry"]["all_registry_entry"]:
-            entry = expense["RegistryEntry"]
-            amount = float(entry["amount"]["value"])
+        for entry in self.get_registry().entries:
+            amount = entry.amount
 
             # skip refunds
-            if entry["type_transaction"] == "BALANCE":
+            if entry.type == "BALANCE":
                 continue
 
             # filter by user if user ID is provided
             if user_id:
                 amount = None
-                for allocation in entry["allocations"]:
-                    if allocation["membership"]["RegistryMembershipNonUser"][
-                        "id"
-                    ] == int(user_id):
-                        amount = float(allocation["amount"]["value"])
+                for mid, value in zip(entry.alloc_ids, entry.alloc_amounts):
+                    if mid == int(user_id):
+                        amount = value
 
             if amount is not None:
                 expenses.append(amount)
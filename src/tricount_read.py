@@ -1,61 +1,107 @@
-from tricount_api import TricountAPI
-import json
 import os
-from typing import Dict, Any
-from dotenv import load_dotenv
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
 
-load_dotenv()
+from fx_rates import FxTable, entry_factors
+from registry_decode import Registry, decode_registry
 
 
 def fetch_tricount_data():
+    # network/crypto deps and .env are only needed when actually fetching
+    from dotenv import load_dotenv
+    from tricount_api import TricountAPI
+
+    load_dotenv()
+
     # Initialize with tricount public identifier token from env
     key = os.environ.get("TRICOUNT_KEY")
     trapi = TricountAPI(tricount_key=key)
-    # Access raw JSON data
-    return trapi.get_data()
-
-
-def get_net_from_tricount(data: Any) -> Dict[str, float]:
-    # data may be a dict (already loaded JSON) or a path to the JSON file
-    if isinstance(data, str):
-        with open(data, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    reg = data["Response"][0]["Registry"]
-
-    # id -> display_name
-    members = {
-        mm["RegistryMembershipNonUser"]["id"]: mm["RegistryMembershipNonUser"]["alias"][
-            "display_name"
-        ]
-        for mm in reg.get("memberships", [])
-    }
-
-    paid = {name: 0.0 for name in members.values()}
-    share = {name: 0.0 for name in members.values()}
-
-    for ewrap in reg.get("all_registry_entry", []):
-        e = ewrap.get("RegistryEntry")
-        if not e:
-            continue
-        amt = float(e["amount"]["value"])
-        mo = e.get("membership_owned")
-        if mo and mo.get("RegistryMembershipNonUser"):
-            owner_rm = mo["RegistryMembershipNonUser"]
-            owner_name = members.get(owner_rm["id"], owner_rm["alias"]["display_name"])
-            paid[owner_name] += -amt
-        for alloc in e.get("allocations", []):
-            a_amt = float(alloc["amount"]["value"])
-            mem = alloc.get("membership")
-            if mem and mem.get("RegistryMembershipNonUser"):
-                rm = mem["RegistryMembershipNonUser"]
-                name = members.get(rm["id"], rm["alias"]["display_name"])
-                share[name] += -a_amt
-
-    # round to 2 decimal places and return floats
-    net = {}
-    for name in paid:
-        net[name] = round(paid[name] - share[name], 3)
-    return net
+    # Decoded straight from the response body (no full JSON tree in memory)
+    return trapi.get_registry()
+
+
+# (date, [(membership id, paid, share), ...])
+EntryRow = Tuple[str, List[Tuple[int, float, float]]]
+
+
+def settlement_currency(reg: Registry, currency: Optional[str] = None) -> str:
+    # 指定がなければレジストリの通貨 (それもなければ最初のエントリの通貨)
+    return currency or reg.currency or next((e.currency for e in reg.entries if e.currency), "")
+
+
+def _factors(
+    reg: Registry, currency: Optional[str], fx: Optional[FxTable]
+) -> Tuple[array, bool]:
+    # (エントリごとの換算係数, 換算があったか)
+    target = settlement_currency(reg, currency)
+    factors = entry_factors(reg.entries, fx, target, reg.currency or target)
+    return factors, any(k != 1.0 for k in factors)
+
+
+def read_entries(
+    data: Any, currency: Optional[str] = None, fx: Optional[FxTable] = None
+) -> Tuple[List[EntryRow], Dict[int, str]]:
+    """
+    Per-entry paid/share amounts by membership id, in registry order, plus the
+    id -> display_name table. Amounts are in `currency` (the registry's own
+    by default); entries in other currencies are converted with the rate
+    table `fx` and rejected without one.
+    """
+    # data may be a dict (already loaded JSON), raw JSON, a path to the file
+    # or a decoded Registry
+    reg = decode_registry(data)
+    factors, _ = _factors(reg, currency, fx)
+    rows: List[EntryRow] = []
+    for e, k in zip(reg.entries, factors):
+        deltas = []
+        if e.owner is not None:
+            deltas.append((e.owner, -e.amount * k, 0.0))
+        for mid, a_amt in zip(e.alloc_ids, e.alloc_amounts):
+            deltas.append((mid, 0.0, -a_amt * k))
+        rows.append((e.date, deltas))
+    return rows, reg.names()
+
+
+def get_net_by_member(
+    data: Any, currency: Optional[str] = None, fx: Optional[FxTable] = None
+) -> Tuple[Dict[int, float], Dict[int, str]]:
+    """
+    Net balance per membership id, plus the id -> display_name table.
+    Members sharing a display name stay separate. Balances are in `currency`
+    (the registry's own by default); entries in other currencies are
+    converted with the rate table `fx` and rejected without one.
+    """
+    reg = decode_registry(data)
+    factors, converted = _factors(reg, currency, fx)
+
+    paid = dict.fromkeys(reg.members, 0.0)
+    share = dict.fromkeys(reg.members, 0.0)
+    for e, k in zip(reg.entries, factors):
+        if e.owner is not None:
+            paid[e.owner] -= e.amount * k
+        for mid, a_amt in zip(e.alloc_ids, e.alloc_amounts):
+            share[mid] -= a_amt * k
+
+    # round to 3 decimal places and return floats
+    net = {mid: round(paid[mid] - share[mid], 3) for mid in reg.members}
+    if converted and net:
+        # 換算後の丸め誤差は残高が一番大きい人に寄せる (合計を0に保つ)
+        residual = round(sum(net.values()), 3)
+        if residual and abs(residual) <= 0.0005 * len(net):
+            mid = max(net, key=lambda m: abs(net[m]))
+            net[mid] = round(net[mid] - residual, 3)
+    return net, reg.names()
+
+
+def get_net_from_tricount(
+    data: Any, currency: Optional[str] = None, fx: Optional[FxTable] = None
+) -> Dict[str, float]:
+    # display_name keyed view of get_net_by_member (same names are merged)
+    net, names = get_net_by_member(data, currency, fx)
+    out: Dict[str, float] = {}
+    for mid, amt in net.items():
+        out[names[mid]] = round(out.get(names[mid], 0.0) + amt, 3)
+    return out
 
 
 if __name__ == "__main__":
@@ -0,0 +1,40 @@
+import sys
+import os
+from datetime import date, datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from balance_history import BalanceHistory
+from tricount_read import get_net_by_member
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+
+
+class TestBalanceHistory:
+    def test_end_matches_all_time_net(self):
+        """Test that the last point equals the all-time balances"""
+        history = BalanceHistory(SAMPLE)
+        net, _ = get_net_by_member(SAMPLE)
+
+        assert history.balance_at("2099-01-01") == net
+
+    def test_balance_as_of_date(self):
+        """Test balances before, on and after entry dates"""
+        history = BalanceHistory(SAMPLE)
+
+        assert history.balance_at(date(2025, 1, 1)) == {1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0}
+        # a date includes the whole day
+        assert history.balance_at(date(2025, 1, 5)) == {
+            1: -100.0, 2: 200.0, 3: -100.0, 4: 0.0
+        }
+        assert history.balance_at(datetime(2025, 1, 5, 11, 59)) == {
+            1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0
+        }
+        assert history.balance_at("2025-01-31") == {1: 20.0, 2: 200.0, 3: -160.0, 4: -60.0}
+
+    def test_change_between(self):
+        """Test the net change over a month"""
+        history = BalanceHistory(SAMPLE)
+
+        assert history.change_between("2025-01-31", "2025-02-28") == {
+            1: -30.0, 2: -70.0, 3: 40.0, 4: 60.0
+        }
@@ -0,0 +1,189 @@
+import json
+import pytest
+import random
+import sys
+import os
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from channel_topology import ChannelTopology
+from optimal_settlement import optimal_settle, plan_cost
+
+
+ZELLE = [("matt", "hibiki"), ("matt", "gowtham"), ("hibiki", "gowtham")]
+VENMO = [("guillermo", "matt")]
+
+
+def net_of(plan):
+    net = {}
+    for (channel, sender, receiver), amount in plan.items():
+        net[sender] = net.get(sender, 0.0) - amount
+        net[receiver] = net.get(receiver, 0.0) + amount
+    return {p: b for p, b in net.items() if abs(b) > 1e-9}
+
+
+class TestChannelTopology:
+    def test_interns_names_to_dense_ids(self):
+        """Test that every name gets one id and arcs are stored as id arrays"""
+        topo = ChannelTopology({"zelle": ZELLE, "venmo": VENMO})
+
+        assert sorted(topo.ids.values()) == list(range(len(topo.names)))
+        assert len(topo.keys) == len(topo.tails) == len(topo.heads) == 8
+        for (ch, u, v), t, h in zip(topo.keys, topo.tails, topo.heads):
+            assert topo.names[t] == u and topo.names[h] == v
+
+    def test_matches_optimal_settle_across_balances(self):
+        """Test that one compiled topology gives the same plans as fresh solves"""
+        topo = ChannelTopology({"zelle": ZELLE, "venmo": VENMO})
+        scenarios = [
+            {"guillermo": 262.91, "matt": -95.18, "hibiki": 741.74, "gowtham": -909.47},
+            {"guillermo": -50.0, "matt": 0.0, "hibiki": 20.0, "gowtham": 30.0},
+            {"matt": 10.0, "hibiki": -10.0},
+        ]
+        for balances in scenarios:
+            assert topo.settle(balances) == optimal_settle(balances, ZELLE, VENMO)
+
+    def test_compiled_network_matches_fresh_solves(self):
+        """Test optimal costs of the reused residual network on random groups"""
+        rng = random.Random(7)
+        for n in (10, 40, 80):
+            names = [f"p{i}" for i in range(n)]
+            pairs = [(names[i], names[i + 1]) for i in range(n - 1)]
+            pairs += [(rng.choice(names), rng.choice(names)) for _ in range(n)]
+            topo = ChannelTopology(
+                {"zelle": pairs, "venmo": pairs[::4]},
+                objective=("hops", "fee"),
+                channel_costs={"venmo": {"fee": 2}},
+            )
+            for _ in range(3):
+                balances = {x: round(rng.uniform(-100, 100), 2) for x in names}
+                balances["p0"] = round(balances["p0"] - sum(balances.values()), 2)
+                fresh = optimal_settle(
+                    balances, pairs, pairs[::4], objective=("hops", "fee"),
+                    channel_costs={"venmo": {"fee": 2}},
+                )
+                result = topo.solve(balances)
+
+                assert result.optimal
+                assert net_of(result.plan) == pytest.approx(
+                    {p: b for p, b in balances.items() if b}, abs=1e-6
+                )
+                assert plan_cost(result.plan) == pytest.approx(plan_cost(fresh))
+
+    def test_compiled_solve_beats_fresh_setup(self):
+        """Benchmark: repeated solves on one topology beat fresh optimal_settle"""
+        rng = random.Random(3)
+        names = [f"p{i}" for i in range(60)]
+        pairs = [(names[i], names[i + 1]) for i in range(59)]
+        pairs += [(rng.choice(names), rng.choice(names)) for _ in range(60)]
+        balances = {x: round(rng.uniform(-100, 100), 2) for x in names}
+        balances["p0"] = round(balances["p0"] - sum(balances.values()), 2)
+        topo = ChannelTopology({"zelle": pairs})
+        topo.settle(balances)
+
+        # 交互に測って、マシンの負荷の変化が片方にだけ乗らないようにする
+        compiled, fresh = [], []
+        for _ in range(9):
+            compiled.append(timeit.timeit(lambda: topo.settle(balances), number=5))
+            fresh.append(timeit.timeit(lambda: optimal_settle(balances, pairs, []), number=5))
+        assert min(compiled) < min(fresh)
+
+    def test_config_only_relay_is_not_used(self):
+        """Test that people outside the balances never relay, with or without a budget"""
+        topo = ChannelTopology({"zelle": [("a", "x"), ("x", "b")]})
+
+        for budget in (None, 1.0):
+            with pytest.raises(RuntimeError, match="No feasible path"):
+                topo.settle({"a": -10.0, "b": 10.0}, time_budget=budget)
+        # x の残高があれば (0 でも) 経由できる
+        assert topo.settle({"a": -10.0, "x": 0.0, "b": 10.0}) == {
+            ("zelle", "a", "x"): 10.0, ("zelle", "x", "b"): 10.0
+        }
+
+    def test_from_file_with_costs(self, tmp_path):
+        """Test loading channels, canonicalising names and reading cost weights"""
+        path = tmp_path / "channels.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "channels": {"zelle": [["A", "B"], ["B", "C"]], "venmo": [["A", "C"]]},
+                    "objective": ["fee", "hops"],
+                    "channel_costs": {"venmo": {"fee": 3}},
+                }
+            )
+        )
+        topo = ChannelTopology.from_file(str(path), resolve=str.lower)
+
+        plan = topo.settle({"a": -100.0, "b": 0.0, "c": 100.0})
+        assert plan == {("zelle", "a", "b"): 100.0, ("zelle", "b", "c"): 100.0}
+
+
+class TestMemberIds:
+    def test_main_settles_by_membership_id(self, monkeypatch, capsys):
+        """Test that main() keys balances by membership id and prints names"""
+        import main
+
+        sample = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+        monkeypatch.setattr(main, "fetch_tricount_data", lambda: sample)
+        main.main()
+        out = capsys.readouterr().out
+
+        assert "- *Hibiki*: $130.00" in out
+        assert "- *Gowtham* → *Hibiki*: $120.00 (zelle)" in out
+        assert "- *Matt* → *Hibiki*: $10.00 (zelle)" in out
+
+    def test_member_keys_resolve_names_and_ids(self, tmp_path):
+        """Test that shared names are only rejected when the config needs them"""
+        from main import load_topology, member_keys
+
+        path = tmp_path / "channels.json"
+        path.write_text(json.dumps({"channels": {"zelle": [["Hibiki ", 2]]}}))
+        topo = load_topology(str(path))
+        assert load_topology(str(path)) is topo
+
+        # 同名の二人でも、片方がIDで指定されていれば区別できる
+        names = {1: "Matt", 2: " matt", 3: "Hibiki"}
+        assert member_keys(names, topo) == {2: 2, "hibiki": 3}
+
+        path.write_text(json.dumps({"channels": {"zelle": [["Hibiki", "Matt"]]}}))
+        os.utime(path, ns=(0, 10**18))
+        with pytest.raises(ValueError, match="Ambiguous"):
+            member_keys(names, load_topology(str(path)))
+
+    def test_shared_config_with_outsider(self, tmp_path, capsys):
+        """Test that a relay only in channels.json is skipped for this registry"""
+        from main import print_settlement, settle_data
+
+        sample = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+        path = tmp_path / "channels.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "channels": {
+                        "zelle": [["Matt", "Hibiki"], ["Gowtham", "Outsider"], ["Outsider", "Hibiki"]],
+                        "venmo": [["Guillermo", "Matt"], ["Gowtham", "Guillermo"]],
+                    }
+                }
+            )
+        )
+        balances, names, plan, topology = settle_data(sample, channels_file=str(path))
+
+        assert all(s in names and r in names for _, s, r in plan)
+        assert plan[("venmo", 3, 4)] == 120.0
+        print_settlement(balances, names, plan, topology)
+        assert "Outsider" not in capsys.readouterr().out
+
+    def test_settle_data_with_id_entries(self, tmp_path):
+        """Test a channel config that names members by membership id"""
+        from main import settle_data
+
+        sample = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+        path = tmp_path / "channels.json"
+        path.write_text(json.dumps({"channels": {"zelle": [[1, 2], [3, 2]]}}))
+        balances, names, plan, _ = settle_data(sample, channels_file=str(path))
+        assert plan == {("zelle", 3, 2): 120.0, ("zelle", 1, 2): 10.0}
+
+        path.write_text(json.dumps({"channels": {"zelle": [[1, "hibiki"], [3, 2]]}}))
+        os.utime(path, ns=(0, 10**18))
+        with pytest.raises(ValueError, match="both name and id"):
+            settle_data(sample, channels_file=str(path))
@@ -0,0 +1,139 @@
+import copy
+import json
+import subprocess
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from consolidate import IdentityMap, consolidate, settle_consolidated
+from main import settle_data
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/"))
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+
+
+def load_sample():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def reversed_sample():
+    """The sample with every amount negated and membership ids shifted"""
+    data = copy.deepcopy(load_sample())
+
+    def walk(obj):
+        if isinstance(obj, dict):
+            if "RegistryMembershipNonUser" in obj:
+                obj["RegistryMembershipNonUser"]["id"] += 10
+            if isinstance(obj.get("amount"), dict):
+                obj["amount"]["value"] = str(-float(obj["amount"]["value"]))
+            for v in obj.values():
+                walk(v)
+        elif isinstance(obj, list):
+            for v in obj:
+                walk(v)
+
+    walk(data)
+    return data
+
+
+class TestConsolidate:
+    def test_merges_by_person(self):
+        """Test that members of different registries merge by display name"""
+        cons = consolidate([("a", load_sample()), ("b", load_sample())])
+
+        assert cons.registries == 2
+        assert cons.balances == {"matt": -20.0, "hibiki": 260.0, "gowtham": -240.0, "guillermo": 0.0}
+        assert cons.names["matt"] == "Matt"
+
+    def test_opposite_debts_cancel(self):
+        """Test that one solve replaces transfers that cancel across registries"""
+        separate = [settle_data(d)[2] for d in (load_sample(), reversed_sample())]
+        cons = consolidate([("a", load_sample()), ("b", reversed_sample())])
+        plan = settle_consolidated(cons)
+
+        assert all(separate)
+        assert set(cons.balances.values()) == {0.0}
+        assert plan == {}
+
+    def test_identity_map(self, tmp_path):
+        """Test per-registry member overrides and display-name aliases"""
+        path = tmp_path / "identities.json"
+        path.write_text(
+            json.dumps({"members": {"b": {"14": "Matt"}}, "aliases": {"Gowtham": "Gow"}})
+        )
+        identity = IdentityMap.from_file(str(path))
+
+        cons = consolidate([("a", load_sample()), ("b", reversed_sample())], identity)
+
+        # b's Guillermo (id 14) is folded into Matt; Gowtham's balances cancel
+        assert cons.balances["gow"] == 0.0
+        assert "guillermo" in cons.balances
+        assert identity("b", 14, "Guillermo") == "matt"
+        assert identity.person(" GOWTHAM ") == "gow"
+
+
+    def test_same_name_members_are_not_merged(self):
+        """Test that two same-name members of one registry need the identity map"""
+        data = load_sample()
+        reg = data["Response"][0]["Registry"]
+        guillermo = reg["memberships"][3]["RegistryMembershipNonUser"]["alias"]
+        guillermo["display_name"] = "Matt"
+
+        with pytest.raises(ValueError, match="Members 1 and 4 of a"):
+            consolidate([("a", data)])
+
+        identity = IdentityMap({"a": {4: "Matt G"}})
+        cons = consolidate([("a", data)], identity)
+        assert cons.balances == {"matt": -10.0, "hibiki": 130.0, "gowtham": -120.0, "matt g": 0.0}
+
+
+class TestConsolidateCli:
+    def test_cli_consolidates(self):
+        """Test that --consolidate prints one plan for all registries"""
+        proc = subprocess.run(
+            [sys.executable, "settle_cli.py", "--consolidate", "--format", "jsonl", SAMPLE, SAMPLE],
+            cwd=SRC,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        lines = proc.stdout.splitlines()
+
+        assert len(lines) == 1
+        rec = json.loads(lines[0])
+        assert rec["group"] == "consolidated"
+        assert rec["verified"] is True
+        # two transfers instead of four, each carrying both registries' debt
+        assert len(rec["transfers"]) == 2
+        assert rec["total"] == 260.0
+
+    def test_cli_labels_registries_by_path(self, tmp_path):
+        """Test that same-named files in different directories stay apart"""
+        for d in ("a", "b"):
+            (tmp_path / d).mkdir()
+            (tmp_path / d / "trip.json").write_text(json.dumps(load_sample()))
+        identities = tmp_path / "identities.json"
+        identities.write_text(json.dumps({"members": {"b/trip.json": {"4": "Willy"}}}))
+
+        proc = subprocess.run(
+            [
+                sys.executable, os.path.join(SRC, "settle_cli.py"), "--consolidate",
+                "--format", "jsonl", "--identities", str(identities),
+                "--channels", os.path.join(SRC, "..", "channels.json"),
+                "a/trip.json", "b/trip.json",
+            ],
+            cwd=tmp_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        rec = json.loads(proc.stdout)
+        balances = {b["id"]: b["balance"] for b in rec["balances"]}
+
+        # only b's Guillermo is mapped to Willy
+        assert balances["guillermo"] == 0.0
+        assert balances["willy"] == 0.0
+        assert balances["matt"] == -20.0
@@ -0,0 +1,136 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from balance_history import BalanceHistory
+from consolidate import consolidate
+from fx_rates import FxTable, load_fx_table
+from main import settle_data
+from tricount_read import get_net_by_member, read_entries
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+
+RATES = {
+    "base": "USD",
+    "rates": {
+        "2025-01-01": {"EUR": 1.1, "JPY": 0.0068},
+        "2025-02-01": {"EUR": 1.2},
+    },
+}
+
+
+def load_sample():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def with_currency(data, index, currency):
+    """Re-denominate one entry (and its allocations) in another currency"""
+    entry = data["Response"][0]["Registry"]["all_registry_entry"][index]["RegistryEntry"]
+    entry["amount"]["currency"] = currency
+    for alloc in entry["allocations"]:
+        alloc["amount"]["currency"] = currency
+    return data
+
+
+class TestFxTable:
+    def test_latest_rate_on_or_before(self):
+        """Test that each day uses the most recent rate"""
+        fx = FxTable(RATES["base"], RATES["rates"])
+        days = ["2025-01-05", "2025-02-01", "2025-03-10", "2025-01-05"]
+
+        assert fx.factors("EUR", "USD", days) == {
+            "2025-01-05": 1.1, "2025-02-01": 1.2, "2025-03-10": 1.2
+        }
+        assert fx.factors("EUR", "JPY", ["2025-01-02"]) == {"2025-01-02": 1.1 / 0.0068}
+        assert fx.factors("USD", "USD", ["2025-01-02"]) == {"2025-01-02": 1.0}
+
+    def test_missing_rates(self):
+        """Test that unknown currencies and early dates are rejected"""
+        fx = FxTable(RATES["base"], RATES["rates"])
+
+        with pytest.raises(ValueError, match="No FX rates for GBP"):
+            fx.factors("GBP", "USD", ["2025-01-05"])
+        with pytest.raises(ValueError, match="on or before 2024-12-31"):
+            fx.factors("EUR", "USD", ["2024-12-31"])
+        # 日付のないエントリは最初のレート
+        assert fx.factors("EUR", "USD", [""]) == {"": 1.1}
+
+    def test_file_cache(self, tmp_path):
+        """Test that a table is read once and re-read when the file changes"""
+        path = tmp_path / "rates.json"
+        path.write_text(json.dumps(RATES))
+        first = load_fx_table(str(path))
+
+        assert load_fx_table(str(path)) is first
+        path.write_text(json.dumps({"base": "USD", "rates": {"2025-01-01": {"EUR": 2.0}}}))
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+        assert load_fx_table(str(path)) is not first
+
+
+class TestCurrencyAwareBalances:
+    def test_mixed_registry(self):
+        """Test that a EUR entry is converted before summing"""
+        data = with_currency(load_sample(), 0, "EUR")
+        fx = FxTable(RATES["base"], RATES["rates"])
+
+        net, _ = get_net_by_member(data, currency="USD", fx=fx)
+
+        # the 300 EUR groceries count as 330 USD
+        assert net == {1: -20.0, 2: 150.0, 3: -130.0, 4: 0.0}
+
+    def test_settlement_currency(self):
+        """Test balances reported in another currency still sum to zero"""
+        fx = FxTable("USD", {"2025-01-01": {"EUR": 3.0}})
+
+        net, _ = get_net_by_member(load_sample(), currency="EUR", fx=fx)
+
+        assert net[2] == pytest.approx(130.0 / 3, abs=1e-3)
+        assert abs(sum(net.values())) < 1e-6
+
+    def test_single_currency_needs_no_table(self):
+        """Test that same-currency registries are unchanged without rates"""
+        assert get_net_by_member(load_sample(), currency="USD") == get_net_by_member(
+            load_sample()
+        )
+        with pytest.raises(ValueError, match="No FX rates for EUR"):
+            get_net_by_member(with_currency(load_sample(), 0, "EUR"), currency="USD")
+
+    def test_mixed_currencies_need_a_table(self):
+        """Test that the default (registry) currency never sums mixed entries"""
+        data = with_currency(load_sample(), 0, "EUR")
+
+        with pytest.raises(ValueError, match="No FX rates for EUR"):
+            get_net_by_member(data)
+        with pytest.raises(ValueError, match="No FX rates for EUR"):
+            BalanceHistory(data)
+        with pytest.raises(ValueError, match="No FX rates for EUR"):
+            consolidate([("a", load_sample()), ("b", with_currency(load_sample(), 1, "EUR"))])
+
+        fx = FxTable(RATES["base"], RATES["rates"])
+        net, _ = get_net_by_member(data, fx=fx)
+        assert net == {1: -20.0, 2: 150.0, 3: -130.0, 4: 0.0}
+
+    def test_history_in_settlement_currency(self):
+        """Test that point-in-time balances are converted like the totals"""
+        data = with_currency(load_sample(), 0, "EUR")
+        fx = FxTable(RATES["base"], RATES["rates"])
+        history = BalanceHistory(data, currency="USD", fx=fx)
+
+        net, _ = get_net_by_member(data, currency="USD", fx=fx)
+        assert history.balance_at("2099-01-01") == net
+        rows, _ = read_entries(data, fx=fx)
+        assert rows[0][1][0] == (2, 330.0, 0.0)
+
+    def test_settle_data(self):
+        """Test that the converted balances flow through to the plan"""
+        data = with_currency(load_sample(), 0, "EUR")
+        fx = FxTable(RATES["base"], RATES["rates"])
+
+        balances, _, plan, _ = settle_data(data, currency="USD", fx=fx)
+
+        assert balances[2] == 150.0
+        assert sum(a for (_, _, r), a in plan.items() if r == 2) == pytest.approx(150.0)
@@ -0,0 +1,102 @@
+import json
+import sys
+import os
+import urllib.error
+import urllib.request
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from load_test import ring_channels, run_load
+from mock_tricount import USER_ID, MockTricount, start_mock, synthetic_registry
+from optimal_settlement import optimal_settle
+from tricount_api import TricountAPI
+from tricount_read import get_net_from_tricount
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(**kwargs):
+        server = start_mock(MockTricount(**kwargs))
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestSyntheticRegistry:
+    def test_deterministic_and_balanced(self):
+        """Test that a seed fixes the registry and the balances sum to zero"""
+        a = synthetic_registry(members=8, entries=50, seed="k")
+        b = synthetic_registry(members=8, entries=50, seed="k")
+        net = get_net_from_tricount(a)
+
+        assert a == b
+        assert sorted(net) == [f"m{i}" for i in range(8)]
+        assert abs(sum(net.values())) < 1e-6
+
+
+class TestMockServer:
+    def test_api_against_mock(self, mock_server):
+        """Test the full fetch, parse and settle path through TricountAPI"""
+        server = mock_server(members=6, entries=40)
+        api = TricountAPI(tricount_key="abc", base_url=server.base_url)
+
+        assert api.get_data() == synthetic_registry(6, 40, seed="abc")
+        assert api.get_users() == {str(i + 1): f"m{i}" for i in range(6)}
+        balances = get_net_from_tricount(api.get_registry())
+        plan = optimal_settle(balances, *ring_channels(list(balances)))
+        assert plan
+
+    def test_registry_requires_token(self, mock_server):
+        """Test that the registry endpoint rejects unauthenticated requests"""
+        server = mock_server()
+        url = f"{server.base_url}/v1/user/{USER_ID}/registry?public_identifier_token=k"
+
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(url)
+        assert e.value.code == 401
+        assert "Error" in json.loads(e.value.read())
+
+    def test_injected_errors_surface_as_auth_failure(self, mock_server):
+        """Test that an erroring server makes TricountAPI raise ValueError"""
+        server = mock_server(error_rate=1.0)
+
+        with pytest.raises(ValueError, match="Authentication failed"):
+            TricountAPI(tricount_key="abc", base_url=server.base_url)
+
+    def test_base_url_from_environment(self, mock_server, monkeypatch):
+        """Test that TRICOUNT_BASE_URL redirects the client"""
+        server = mock_server(members=3, entries=5)
+        monkeypatch.setenv("TRICOUNT_BASE_URL", server.base_url + "/")
+
+        api = TricountAPI(tricount_key="env")
+        assert api.base_url == server.base_url
+        assert len(api.get_users()) == 3
+
+
+class TestLoad:
+    def test_concurrent_load(self, mock_server):
+        """Test that every request completes under concurrency"""
+        server = mock_server(members=12, entries=200)
+
+        report = run_load(server.base_url, keys=["a", "b"], clients=3, requests=12)
+
+        assert (report.ok, report.errors) == (12, 0)
+        assert report.throughput > 0
+        assert report.p50_ms <= report.p95_ms
+
+    def test_load_with_errors(self, mock_server):
+        """Test that injected errors are counted and clients recover"""
+        server = mock_server(members=5, entries=20, error_rate=0.3, seed=1)
+
+        report = run_load(server.base_url, clients=2, requests=20)
+
+        assert report.ok + report.errors == 20
+        assert report.errors > 0
+        assert report.ok > 0
@@ -0,0 +1,242 @@
+import pytest
+import random
+import sys
+import time
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from graph_reduction import reduce_graph
+from optimal_settlement import (
+    anytime_settle,
+    greedy_settle,
+    mk_arcs,
+    optimal_settle,
+    plan_cost,
+)
+
+
+BALANCES = {
+    "guillermo": 262.91,
+    "matt": -95.18,
+    "hibiki": 741.74,
+    "gowtham": -909.47,
+}
+ZELLE = [("matt", "hibiki"), ("matt", "gowtham"), ("hibiki", "gowtham")]
+VENMO = [("guillermo", "matt")]
+
+
+def net_of(plan):
+    net = {}
+    for (channel, sender, receiver), amount in plan.items():
+        net[sender] = net.get(sender, 0.0) - amount
+        net[receiver] = net.get(receiver, 0.0) + amount
+    return net
+
+
+def assert_settles(balances, plan):
+    net = net_of(plan)
+    for person, expected in balances.items():
+        assert abs(net.get(person, 0.0) - expected) < 1e-6
+    assert all(amount > 0 for amount in plan.values())
+
+
+def random_group(n, extra, seed):
+    rng = random.Random(seed)
+    names = [f"p{i}" for i in range(n)]
+    balances = {x: round(rng.uniform(-100, 100), 2) for x in names}
+    balances["p0"] = round(balances["p0"] - sum(balances.values()), 2)
+    pairs = [(names[i], names[i + 1]) for i in range(n - 1)]
+    pairs += [(rng.choice(names), rng.choice(names)) for _ in range(extra)]
+    return balances, pairs
+
+
+class TestOptimalSettle:
+    def test_readme_example(self):
+        """Test the example plan from the README"""
+        plan = optimal_settle(BALANCES, ZELLE, VENMO)
+
+        assert_settles(BALANCES, plan)
+        assert abs(plan[("zelle", "gowtham", "hibiki")] - 741.74) < 1e-6
+        assert abs(plan[("venmo", "matt", "guillermo")] - 262.91) < 1e-6
+        assert abs(plan_cost(plan) - 1172.38) < 1e-6
+
+    def test_unbalanced_raises(self):
+        """Test that non-zero sum balances raise error"""
+        with pytest.raises(ValueError, match="sum to 0"):
+            optimal_settle({"matt": 100.0, "hibiki": -50.0}, ZELLE, VENMO)
+
+    def test_rerouted_flow_is_conserved(self):
+        """Test that flow pushed back along reverse edges leaves a valid plan"""
+        balances, pairs = random_group(60, 60, seed=3)
+        plan = optimal_settle(balances, pairs, [])
+
+        assert_settles(balances, plan)
+
+
+class TestAnytimeSettle:
+    def test_greedy_is_feasible(self):
+        """Test that the greedy start plan settles every balance"""
+        balances, pairs = random_group(80, 80, seed=1)
+        plan = greedy_settle(balances, mk_arcs(pairs, "zelle"))
+
+        assert_settles(balances, plan)
+
+    def test_large_budget_is_optimal(self):
+        """Test that with enough time the anytime result matches the exact solve"""
+        balances, pairs = random_group(40, 40, seed=2)
+        result = anytime_settle(balances, pairs, [], time_budget=60.0)
+        exact = optimal_settle(balances, pairs, [])
+
+        assert result.optimal
+        assert abs(result.gap) < 1e-6
+        assert abs(result.cost - plan_cost(exact)) < 1e-6
+        assert_settles(balances, result.plan)
+
+    def test_tight_budget_reports_bounds(self):
+        """Test that a tight budget still gives a feasible plan with a valid gap"""
+        balances, pairs = random_group(300, 300, seed=4)
+        result = anytime_settle(balances, pairs, [], time_budget=0.0)
+        exact_cost = plan_cost(optimal_settle(balances, pairs, []))
+
+        assert_settles(balances, result.plan)
+        assert result.lower_bound <= exact_cost + 1e-6
+        assert result.cost >= exact_cost - 1e-6
+        assert abs(result.gap - (result.cost - result.lower_bound)) < 1e-9
+
+    def test_budget_is_respected_on_large_groups(self):
+        """Test that the whole anytime solve stays close to its time budget"""
+        balances, pairs = random_group(2000, 2000, seed=5)
+        anytime_settle(balances, pairs, [], time_budget=0.05)  # warm-up
+
+        elapsed = []
+        for _ in range(3):
+            start = time.perf_counter()
+            result = anytime_settle(balances, pairs, [], time_budget=0.05)
+            elapsed.append(time.perf_counter() - start)
+            assert_settles(balances, result.plan)
+            assert result.lower_bound <= result.cost
+
+        # 一番速い回で見る (負荷の高いマシンでの揺れを除く)
+        assert min(elapsed) < 0.05 * 1.1
+
+    def test_time_budget_option(self):
+        """Test the time_budget keyword of optimal_settle"""
+        plan = optimal_settle(BALANCES, ZELLE, VENMO, time_budget=0.05)
+
+        assert_settles(BALANCES, plan)
+
+
+class TestGraphReduction:
+    def test_relay_chain_is_contracted(self):
+        """Test that zero-balance relays and leaves are removed and expanded back"""
+        balances = {"a": -10.0, "x": 0.0, "y": 0.0, "b": 10.0, "leaf": 0.0}
+        pairs = [("a", "x"), ("x", "y"), ("y", "b"), ("b", "leaf")]
+        arcs = [(u, v, 1.0, ((ch, u, v),)) for ch, u, v in mk_arcs(pairs, "zelle")]
+
+        nodes, reduced = reduce_graph(balances, arcs)
+
+        assert sorted(nodes) == ["a", "b"]
+        assert sorted((u, v, cost) for u, v, cost, _ in reduced) == [
+            ("a", "b", 3.0),
+            ("b", "a", 3.0),
+        ]
+
+        plan = optimal_settle(balances, pairs, [])
+        assert plan == {
+            ("zelle", "a", "x"): 10.0,
+            ("zelle", "x", "y"): 10.0,
+            ("zelle", "y", "b"): 10.0,
+        }
+
+    def test_parallel_channels_keep_first(self):
+        """Test that equal-cost parallel channels collapse to the first channel"""
+        balances = {"a": -5.0, "b": 5.0}
+        plan = optimal_settle(balances, [("a", "b")], [("a", "b")])
+
+        assert plan == {("zelle", "a", "b"): 5.0}
+
+    def test_sparse_topology_shrinks(self):
+        """Test that a sparse tree with few non-zero members shrinks several-fold"""
+        rng = random.Random(5)
+        names = [f"q{i}" for i in range(500)]
+        pairs = [(names[i], names[rng.randrange(max(0, i - 3), i)]) for i in range(1, 500)]
+        balances = {x: 0.0 for x in names}
+        for x in rng.sample(names, 30):
+            balances[x] = round(rng.uniform(-50, 50), 2)
+        balances["q0"] = round(balances["q0"] - sum(balances.values()), 2)
+        arcs = [(u, v, 1.0, ((ch, u, v),)) for ch, u, v in mk_arcs(pairs, "zelle")]
+
+        nodes, reduced = reduce_graph(balances, arcs)
+        assert len(nodes) * 3 < len(balances)
+        assert len(reduced) * 3 < len(arcs)
+
+        plan = optimal_settle(balances, pairs, [])
+        full = optimal_settle(balances, pairs, [], reduce=False)
+        assert_settles(balances, plan)
+        assert abs(plan_cost(plan) - plan_cost(full)) < 1e-6
+
+
+class TestLexicographicCosts:
+    # a owes c; a-c directly via venmo (fee), or a-b-c via zelle (free)
+    BALANCES = {"a": -100.0, "b": 0.0, "c": 100.0}
+    ZELLE = [("a", "b"), ("b", "c")]
+    VENMO = [("a", "c")]
+    FEES = {"venmo": {"fee": 3}}
+
+    def test_hops_before_fees(self):
+        """Test that fewer hops win over lower fees when hops come first"""
+        plan = optimal_settle(
+            self.BALANCES,
+            self.ZELLE,
+            self.VENMO,
+            objective=("hops", "fee"),
+            channel_costs=self.FEES,
+        )
+        assert plan == {("venmo", "a", "c"): 100.0}
+
+    def test_fees_before_hops(self):
+        """Test that lower fees win over fewer hops when fees come first"""
+        plan = optimal_settle(
+            self.BALANCES,
+            self.ZELLE,
+            self.VENMO,
+            objective=("fee", "hops"),
+            channel_costs=self.FEES,
+        )
+        assert plan == {("zelle", "a", "b"): 100.0, ("zelle", "b", "c"): 100.0}
+
+    def test_pair_preference_breaks_ties(self):
+        """Test that a per-pair weight overrides the channel weight"""
+        balances = {"a": -10.0, "b": 10.0}
+        plan = optimal_settle(
+            balances,
+            [("a", "b")],
+            [("a", "b")],
+            objective=("hops", "pref"),
+            pair_costs={("zelle", "b", "a"): {"pref": 2}},
+            channel_costs={"venmo": {"pref": 1}},
+        )
+        assert plan == {("venmo", "a", "b"): 10.0}
+
+    def test_large_secondary_cannot_outweigh_primary(self):
+        """Test that the integer scaling keeps the order strict on many members"""
+        balances, pairs = random_group(30, 30, seed=6)
+        fees = {("zelle", a, b): {"fee": (i * 7) % 50} for i, (a, b) in enumerate(pairs)}
+        plan = optimal_settle(
+            balances, pairs, [], objective=("hops", "fee"), pair_costs=fees
+        )
+        hops_only = optimal_settle(balances, pairs, [])
+
+        assert_settles(balances, plan)
+        assert abs(plan_cost(plan) - plan_cost(hops_only)) < 1e-6
+
+    def test_rejects_non_integer_weights(self):
+        """Test that fractional weights are rejected"""
+        with pytest.raises(ValueError, match="non-negative int"):
+            optimal_settle(
+                self.BALANCES,
+                self.ZELLE,
+                self.VENMO,
+                objective=("fee",),
+                channel_costs={"venmo": {"fee": 0.5}},
+            )
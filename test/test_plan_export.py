@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from plan_export import CsvWriter, JsonlWriter, MarkdownWriter, make_record, write_plans
+
+BALANCES = {1: -10.0, 2: 130.0, 3: -120.0}
+NAMES = {1: "Matt", 2: "Hibiki", 3: "Gowtham"}
+PLAN = {("zelle", 1, 2): 10.0, ("zelle", 3, 2): 120.0}
+
+
+def records(n):
+    # a generator, like a batch run over many groups
+    for i in range(n):
+        yield make_record(f"g{i}", BALANCES, NAMES, PLAN)
+
+
+class TestPlanExport:
+    def test_jsonl_one_line_per_group(self):
+        """Test that JSON Lines output has one parseable object per group"""
+        out = io.StringIO()
+        assert write_plans(records(3), JsonlWriter(out)) == 3
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [obj["group"] for obj in lines] == ["g0", "g1", "g2"]
+        assert lines[0]["total"] == 130.0
+        assert lines[0]["verified"] is True
+        assert lines[0]["transfers"][1] == {
+            "from_id": 3, "from": "Gowtham", "to_id": 2, "to": "Hibiki",
+            "channel": "zelle", "amount": 120.0,
+        }
+
+    def test_csv_rows(self):
+        """Test balance, transfer and total rows in CSV output"""
+        out = io.StringIO(newline="")
+        write_plans(records(2), CsvWriter(out))
+
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert len(rows) == 2 * (3 + 2 + 1)
+        assert rows[3] == {
+            "group": "g0", "kind": "transfer", "id": "1", "name": "Matt", "to_id": "2",
+            "to": "Hibiki", "channel": "zelle", "amount": "10.00", "verified": "",
+        }
+        assert rows[5]["kind"] == "total" and rows[5]["verified"] == "True"
+
+    def test_markdown_matches_report(self):
+        """Test the Markdown report format printed by main()"""
+        out = io.StringIO()
+        MarkdownWriter(out).write(make_record("", BALANCES, NAMES, PLAN))
+
+        assert out.getvalue() == (
+            "=== Simple Network-Based Settlement ===\n"
+            "## Balances:\n"
+            "- *Matt*: $-10.00\n"
+            "- *Hibiki*: $130.00\n"
+            "- *Gowtham*: $-120.00\n"
+            "\n ## Settlement Plan:\n"
+            "- *Matt* → *Hibiki*: $10.00 (zelle)\n"
+            "- *Gowtham* → *Hibiki*: $120.00 (zelle)\n"
+            "\nTotal transaction amount: $130.00\n"
+        )
+
+    def test_unverified_plan_is_flagged(self):
+        """Test that a plan that does not settle the balances is marked"""
+        rec = make_record("bad", BALANCES, NAMES, {("zelle", 1, 2): 10.0})
+        assert rec.verified is False
+
+    def test_channels_checked_against_topology(self):
+        """Test that a balanced plan over a missing channel arc is flagged"""
+        from main import settle_data
+
+        sample = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+        balances, names, plan, topology = settle_data(sample)
+        assert make_record("", balances, names, plan, topology).verified
+
+        # Gowtham has no Venmo: conserves the balances but is not a channel
+        moved = {("venmo", 3, 2) if k == ("zelle", 3, 2) else k: f for k, f in plan.items()}
+        assert make_record("", balances, names, moved).verified
+        assert not make_record("", balances, names, moved, topology).verified
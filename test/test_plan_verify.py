@@ -0,0 +1,87 @@
+import random
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from channel_topology import ChannelTopology
+from plan_verify import IncidenceMatrix, PlanVerifier, verify_plan
+
+BALANCES = {"matt": 100.0, "hibiki": -100.0}
+TOPOLOGY = ChannelTopology(
+    {"zelle": [("matt", "hibiki"), ("matt", "gowtham")], "venmo": [("guillermo", "matt")]}
+)
+
+
+class TestIncidenceMatrix:
+    def test_matvec(self):
+        """Test that A @ x is the net amount received per node"""
+        A = IncidenceMatrix(3, [0, 1], [1, 2])
+
+        assert A.matvec([5.0, 2.0]) == [-5.0, 3.0, 2.0]
+
+
+class TestPlanVerifier:
+    def test_valid_plan(self):
+        """Test that a valid plan passes"""
+        report = verify_plan(BALANCES, {("zelle", "hibiki", "matt"): 100.0}, TOPOLOGY)
+
+        assert report.ok
+        assert report.max_residual == 0.0
+        assert report.worst == []
+
+    def test_conservation_violation(self):
+        """Test that the worst residuals are reported"""
+        report = verify_plan(BALANCES, {("zelle", "hibiki", "matt"): 95.0}, TOPOLOGY)
+
+        assert not report.ok
+        assert report.max_residual == 5.0
+        assert sorted(report.worst) == [("hibiki", 5.0), ("matt", -5.0)]
+
+    def test_negative_and_invalid_channel(self):
+        """Test detection of negative transfers and arcs outside the topology"""
+        plan = {
+            ("zelle", "hibiki", "matt"): 110.0,
+            ("zelle", "matt", "hibiki"): 20.0,
+            ("venmo", "matt", "hibiki"): -10.0,
+        }
+        report = verify_plan(BALANCES, plan, TOPOLOGY)
+
+        assert not report.ok
+        assert report.max_residual == 0.0
+        assert report.negative == [(("venmo", "matt", "hibiki"), -10.0)]
+        assert report.invalid == [("venmo", "matt", "hibiki")]
+
+    def test_transfers_with_non_members_are_invalid(self):
+        """Test that routing through someone outside the balances fails"""
+        balances = {"hibiki": -100.0, "guillermo": 100.0}
+        plan = {("zelle", "hibiki", "matt"): 100.0, ("venmo", "matt", "guillermo"): 100.0}
+
+        report = verify_plan(balances, plan, TOPOLOGY)
+        assert report.max_residual == 0.0
+        assert report.invalid == list(plan)
+        assert not report.ok
+        assert not verify_plan(balances, plan).ok
+
+    def test_without_topology(self):
+        """Test conservation checks on plans alone"""
+        assert verify_plan(BALANCES, {("zelle", "hibiki", "matt"): 100.0}).ok
+        assert not verify_plan(BALANCES, {}).ok
+
+    def test_batch_of_settled_plans(self):
+        """Test verifying many solver outputs with one verifier"""
+        rng = random.Random(7)
+        names = TOPOLOGY.names
+        items = []
+        for _ in range(20):
+            balances = {n: round(rng.uniform(-50, 50), 2) for n in names}
+            balances["matt"] = round(balances["matt"] - sum(balances.values()), 2)
+            items.append((balances, TOPOLOGY.settle(balances)))
+
+        # 1件壊す: バッチでもその計画だけが落ちる
+        items[5] = (items[5][0], {k: f + 1.0 for k, f in items[5][1].items()})
+        verifier = PlanVerifier(TOPOLOGY)
+        reports = verifier.verify_many(items)
+
+        assert len(reports) == 20
+        assert [r.ok for r in reports] == [i != 5 for i in range(20)]
+        assert reports == [verifier.verify(b, plan) for b, plan in items]
@@ -0,0 +1,168 @@
+import copy
+import json
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from registry_decode import decode_registry
+from tricount_api import TricountAPI
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+
+
+def load_sample():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def offline_api(data):
+    # TricountAPI without the network round trip in __init__
+    api = TricountAPI.__new__(TricountAPI)
+    api._raw = json.dumps(data).encode("utf-8")
+    api._registry = None
+    return api
+
+
+class TestDecodeRegistry:
+    def test_records(self):
+        """Test the decoded members and entries of the sample registry"""
+        reg = decode_registry(SAMPLE)
+
+        assert reg.names() == {1: "Matt", 2: "Hibiki", 3: "Gowtham", 4: "Guillermo"}
+        assert [m.name for m in reg.members.values()] == list(reg.names().values())
+        first = reg.entries[0]
+        assert (first.id, first.type, first.amount, first.currency, first.owner) == (
+            11, "NORMAL", -300.0, "USD", 2
+        )
+        assert list(first.alloc_ids) == [1, 2, 3]
+        assert list(first.alloc_amounts) == [-100.0, -100.0, -100.0]
+        assert first.date.startswith("2025-01-05")
+
+    def test_inputs_agree(self):
+        """Test that a dict, raw bytes and a path decode the same way"""
+        with open(SAMPLE, "rb") as f:
+            raw = f.read()
+        decoded = [decode_registry(d) for d in (load_sample(), raw, SAMPLE)]
+
+        for reg in decoded:
+            assert reg.names() == decoded[0].names()
+            assert [e.amount for e in reg.entries] == [e.amount for e in decoded[0].entries]
+
+    def test_member_only_in_entries(self):
+        """Test that a payer missing from memberships is still picked up"""
+        data = load_sample()
+        reg = data["Response"][0]["Registry"]
+        owner = reg["all_registry_entry"][0]["RegistryEntry"]["membership_owned"]
+        owner["RegistryMembershipNonUser"]["id"] = 9
+        owner["RegistryMembershipNonUser"]["alias"]["display_name"] = "Guest"
+
+        decoded = decode_registry(data)
+
+        assert decoded.names()[9] == "Guest"
+        assert decoded.entries[0].owner == 9
+
+    def test_stream_order_and_skipped_fields(self):
+        """Test raw JSON with memberships after the entries and extra fields"""
+        data = load_sample()
+        reg = data["Response"][0]["Registry"]
+        reg["all_registry_entry"][0]["RegistryEntry"]["membership_owned"] = {
+            "RegistryMembershipNonUser": {"id": 9, "alias": {"display_name": "Guest"}}
+        }
+        reordered = {"Response": [{"Registry": {
+            "all_registry_entry": reg["all_registry_entry"],
+            "notes": [{"nested": [1, 2, {"x": None}]}],
+            "memberships": reg["memberships"],
+            "currency": "USD",
+        }}, {"Extra": {}}]}
+        decoded = decode_registry(json.dumps(reordered, indent=1).encode("utf-8"))
+
+        assert list(decoded.names()) == [1, 2, 3, 4, 9]
+        assert decoded.memberships == [1, 2, 3, 4]
+        assert decoded.currency == "USD"
+        assert decoded.entries[0].owner == 9
+
+    def test_malformed_reports_position(self):
+        """Test that structural errors raise ValueError naming the entry"""
+        data = load_sample()
+        entry = data["Response"][0]["Registry"]["all_registry_entry"][1]["RegistryEntry"]
+        entry["allocations"][0]["amount"] = {"currency": "USD"}
+
+        with pytest.raises(ValueError, match=r"all_registry_entry\[1\]"):
+            decode_registry(data)
+        with pytest.raises(ValueError, match=r"all_registry_entry\[1\]"):
+            decode_registry(json.dumps(data))
+        with pytest.raises(ValueError, match="Registry"):
+            decode_registry({"Response": []})
+        with pytest.raises(ValueError, match="Registry"):
+            decode_registry(b'{"Response": [{"Registry": null}]}')
+        with pytest.raises(json.JSONDecodeError):
+            decode_registry(b'{"Response": [{"Registry": {"memberships": [}}]}')
+
+
+class TestTricountAPIAccessors:
+    def test_get_users(self):
+        """Test user ids (as strings) to alias pointer names"""
+        api = offline_api(load_sample())
+
+        assert api.get_users() == {"1": "Matt", "2": "Hibiki", "3": "Gowtham", "4": "Guillermo"}
+
+    def test_get_users_lists_memberships_only(self):
+        """Test that members only seen in entries are not reported as users"""
+        data = load_sample()
+        entry = data["Response"][0]["Registry"]["all_registry_entry"][0]["RegistryEntry"]
+        entry["membership_owned"] = {
+            "RegistryMembershipNonUser": {"id": 9, "alias": {"display_name": "Guest"}}
+        }
+        api = offline_api(data)
+
+        assert "9" not in api.get_users()
+        assert api.get_registry().names()[9] == "Guest"
+
+    def test_get_expenses(self):
+        """Test that balance entries are skipped and allocations filter by user"""
+        data = load_sample()
+        api = offline_api(data)
+        entries = data["Response"][0]["Registry"]["all_registry_entry"]
+        expected = [
+            float(e["RegistryEntry"]["amount"]["value"])
+            for e in entries
+            if e["RegistryEntry"]["type_transaction"] != "BALANCE"
+        ]
+
+        assert api.get_expenses() == expected
+        assert api.get_expenses(user_id="1")[0] == -100.0
+
+    def test_data_is_parsed_on_demand(self):
+        """Test that the data attribute still returns the raw JSON dict"""
+        api = offline_api(load_sample())
+
+        assert api.data == load_sample()
+        assert api.get_data() == api.data
+
+    def test_superfluous_authentication_is_an_auth_error(self):
+        """Test that a session without a token fails as an authentication error"""
+
+        class Session:
+            headers = {}
+
+            def post(self, url, json):
+                class Response:
+                    def json(self):
+                        return {"Error": [{"error_description": "Superfluous authentication"}]}
+
+                return Response()
+
+        api = TricountAPI.__new__(TricountAPI)
+        api.session, api.base_url, api.authenticated = Session(), "http://x", False
+        api.app_installation_id, api.rsa_public_key_pem = "id", "pem"
+
+        with pytest.raises(ValueError, match="Authentication failed"):
+            api.update_data()
+
+    def test_registry_cached_until_update(self):
+        """Test that the decoded registry is reused between calls"""
+        api = offline_api(copy.deepcopy(load_sample()))
+
+        assert api.get_registry() is api.get_registry()
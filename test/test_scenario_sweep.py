@@ -0,0 +1,43 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from scenario_sweep import add_pairs, format_table, sweep
+
+BALANCES = {"matt": 300.0, "hibiki": 50.0, "gowtham": 0.0, "guillermo": -350.0}
+NOW = {
+    "zelle": [("matt", "hibiki"), ("matt", "gowtham"), ("hibiki", "gowtham")],
+    "venmo": [("guillermo", "matt")],
+}
+
+
+class TestScenarioSweep:
+    def test_future_venmo_ranks_first(self):
+        """Test that adding Hibiki's Venmo (include_future_venmo) is ranked best"""
+        scenarios = {
+            "now": NOW,
+            "future_venmo": add_pairs(
+                NOW, "venmo", [("hibiki", "matt"), ("hibiki", "guillermo")]
+            ),
+            "no_venmo": {"zelle": NOW["zelle"]},
+        }
+        results = sweep(BALANCES, scenarios, max_workers=2)
+
+        assert [r.name for r in results] == ["future_venmo", "now", "no_venmo"]
+        assert results[0].volume == 350.0
+        assert results[0].transfers == 2
+        assert results[1].volume == 400.0
+        assert results[1].hops == round(400.0 / 350.0, 3)
+        assert not results[2].feasible
+
+        table = format_table(results)
+        assert "| 1 | future_venmo | $350.00 | 2 | 1.000 |" in table
+        assert "| 3 | no_venmo | infeasible | - | - |" in table
+
+    def test_serial_matches_parallel(self):
+        """Test that the in-process path gives the same ranking"""
+        scenarios = {"now": NOW, "copy": add_pairs(NOW, "zelle", [])}
+
+        assert sweep(BALANCES, scenarios, max_workers=1) == sweep(
+            BALANCES, scenarios, max_workers=2
+        )
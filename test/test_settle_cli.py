@@ -0,0 +1,57 @@
+import os
+import re
+import subprocess
+import sys
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/"))
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+
+# cumulative import time budget for the offline CLI, in microseconds
+STARTUP_BUDGET_US = int(os.environ.get("STARTUP_BUDGET_US", "150000"))
+HEAVY_MODULES = ("requests", "cryptography", "dotenv", "uuid", "tricount_api")
+
+
+def import_times(module):
+    """Return {module: cumulative_us} from `python -X importtime`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if m:
+            times[m.group(4)] = int(m.group(2))
+    return times
+
+
+class TestOfflineCli:
+    def test_settles_from_stdin(self):
+        """Test that the CLI settles a registry piped through stdin"""
+        with open(SAMPLE, "r", encoding="utf-8") as f:
+            proc = subprocess.run(
+                [sys.executable, "settle_cli.py", "-"],
+                cwd=SRC,
+                stdin=f,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        assert "- *Gowtham* → *Hibiki*: $120.00 (zelle)" in proc.stdout
+        assert "Total transaction amount: $130.00" in proc.stdout
+
+    def test_no_network_or_crypto_imports(self):
+        """Test that importing the CLI does not pull in network or crypto modules"""
+        times = import_times("settle_cli")
+        loaded = {name.split(".")[0] for name in times}
+
+        assert not loaded & set(HEAVY_MODULES)
+
+    def test_startup_within_budget(self):
+        """Benchmark: cumulative import time of the CLI stays within the budget"""
+        best = min(import_times("settle_cli")["settle_cli"] for _ in range(3))
+
+        assert best < STARTUP_BUDGET_US, f"startup {best}us > {STARTUP_BUDGET_US}us"
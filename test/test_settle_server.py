@@ -0,0 +1,195 @@
+import json
+import os
+import stat
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from registry_decode import decode_registry
+from settle_server import SettlementService, make_server
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+
+
+class FakeAPI:
+    """Stands in for TricountAPI: serves the sample registry, counts calls"""
+
+    instances = 0
+
+    def __init__(self, key):
+        FakeAPI.instances += 1
+        self.updates = 0
+        with open(SAMPLE, "r", encoding="utf-8") as f:
+            self.data = json.load(f)
+
+    def get_registry(self):
+        return decode_registry(self.data)
+
+    def update_data(self):
+        self.updates += 1
+        # Matt settles his 10 with Hibiki in the meantime
+        reg = self.data["Response"][0]["Registry"]
+        reg["all_registry_entry"].append(
+            {
+                "RegistryEntry": {
+                    "amount": {"value": "-10.00", "currency": "USD"},
+                    "membership_owned": reg["memberships"][0],
+                    "allocations": [
+                        {
+                            "amount": {"value": "-10.00", "currency": "USD"},
+                            "membership": reg["memberships"][1],
+                        }
+                    ],
+                }
+            }
+        )
+
+
+class SlowFakeAPI(FakeAPI):
+    """FakeAPI whose re-fetch takes a while"""
+
+    def update_data(self):
+        time.sleep(1.0)
+        super().update_data()
+
+
+def post(url, body):
+    raw = body if isinstance(body, bytes) else json.dumps(body).encode()
+    req = urllib.request.Request(
+        url, data=raw, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+class TestSettlementServer:
+    def setup_method(self):
+        FakeAPI.instances = 0
+        self.service = SettlementService(api_factory=FakeAPI, default_key="k1")
+        self.server = make_server(self.service, port=0, workers=4, quiet=True)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_concurrent_settles_share_one_session(self):
+        """Test that concurrent settle requests reuse one warm registry"""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: post(self.url + "/settle", {}), range(16)))
+
+        assert FakeAPI.instances == 1
+        for out in results:
+            assert out["total"] == 130.0
+            assert {"from": "Gowtham", "to": "Hibiki", "from_id": 3, "to_id": 2,
+                    "amount": 120.0, "channel": "zelle"} in out["transfers"]
+
+        # JSON Lines と同じ形に、検証結果と anytime の情報
+        rec = json.loads(self.jsonl_line())
+        assert results[0] == {**{k: v for k, v in rec.items() if k != "group"},
+                              "optimal": True, "gap": 0.0}
+        assert results[0]["verified"] is True
+
+    def jsonl_line(self):
+        import io
+
+        from main import settle_data
+        from plan_export import JsonlWriter, make_record
+
+        balances, names, plan, topology = settle_data(SAMPLE)
+        out = io.StringIO()
+        JsonlWriter(out).write(make_record("", balances, names, plan, topology))
+        return out.getvalue()
+
+    def test_refresh_reloads_registry(self):
+        """Test that refresh re-fetches through the same session"""
+        post(self.url + "/settle", {"key": "k2"})
+        post(self.url + "/refresh", {"key": "k2"})
+        out = post(self.url + "/settle", {"key": "k2"})
+
+        assert FakeAPI.instances == 1
+        assert self.service.registries["k2"].api.updates == 1
+        assert out["transfers"] == [
+            {"from": "Gowtham", "to": "Hibiki", "from_id": 3, "to_id": 2,
+             "amount": 120.0, "channel": "zelle"}
+        ]
+
+    def test_refresh_of_cold_key_fetches_once(self):
+        """Test that refreshing an unloaded key does not fetch twice"""
+        post(self.url + "/refresh", {"key": "k3"})
+
+        assert FakeAPI.instances == 1
+        assert self.service.registries["k3"].api.updates == 0
+
+    def test_settle_does_not_wait_for_refresh(self):
+        """Test that settles answer from the old state during a slow refresh"""
+        service = SettlementService(api_factory=SlowFakeAPI, default_key="k1")
+        service.settle()
+        refresher = threading.Thread(target=service.refresh)
+        refresher.start()
+        time.sleep(0.1)
+
+        start = time.perf_counter()
+        out = service.settle()
+        elapsed = time.perf_counter() - start
+        refresher.join()
+
+        assert elapsed < 0.5
+        assert out["total"] == 130.0
+        assert service.settle()["total"] == 120.0
+
+    def expect_error(self, path, body, code):
+        try:
+            post(self.url + path, body)
+        except urllib.error.HTTPError as e:
+            assert e.code == code
+            return json.loads(e.read())["error"]
+        raise AssertionError(f"expected {code}")
+
+    def test_errors_are_reported(self, tmp_path):
+        """Test that unknown paths, bad bodies and solver errors come back as JSON errors"""
+        with urllib.request.urlopen(self.url + "/health") as resp:
+            assert json.loads(resp.read()) == {"status": "ok"}
+        self.expect_error("/nope", {}, 404)
+        assert "JSON object" in self.expect_error("/settle", b"[1, 2]", 400)
+        for budget in ("abc", -1, True, [0.1]):
+            error = self.expect_error("/settle", {"time_budget": budget}, 400)
+            assert "time_budget" in error
+
+        # Gowtham cannot reach anyone: the solver fails
+        channels = tmp_path / "channels.json"
+        channels.write_text(json.dumps({"channels": {"zelle": [["Matt", "Hibiki"]]}}))
+        self.service.channels_file = str(channels)
+        assert self.expect_error("/settle", {"key": "k4"}, 400)
+
+        def broken(key):
+            raise KeyError("Response")
+
+        self.service.api_factory = broken
+        assert "KeyError" in self.expect_error("/settle", {"key": "k5"}, 500)
+
+
+class TestUnixSocket:
+    def test_only_stale_sockets_are_replaced(self, tmp_path):
+        """Test that a regular file at the socket path is left alone"""
+        service = SettlementService(api_factory=FakeAPI, default_key="k1")
+        path = tmp_path / "settle.sock"
+        path.write_text("keep me")
+        with pytest.raises(ValueError, match="Not a socket"):
+            make_server(service, unix_path=str(path), quiet=True)
+        assert path.read_text() == "keep me"
+
+        path.unlink()
+        for _ in range(2):
+            # 2回目は前回のソケットを置き換える
+            server = make_server(service, unix_path=str(path), quiet=True)
+            server.server_close()
+            assert stat.S_ISSOCK(os.stat(path).st_mode)
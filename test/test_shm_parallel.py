@@ -0,0 +1,95 @@
+import random
+import sys
+import os
+from itertools import islice
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from channel_topology import ChannelTopology
+from shm_parallel import SharedTopology, _delta, parallel_settle, parallel_solve
+
+
+def random_topology(n, extra, seed, **kwargs):
+    rng = random.Random(seed)
+    names = [f"p{i}" for i in range(n)]
+    pairs = [(names[i], names[i + 1]) for i in range(n - 1)]
+    pairs += [(rng.choice(names), rng.choice(names)) for _ in range(extra)]
+    return ChannelTopology({"zelle": pairs, "venmo": pairs[::3]}, **kwargs), names
+
+
+def random_balances(names, rng):
+    balances = {x: round(rng.uniform(-100, 100), 2) for x in names}
+    balances[names[0]] = round(balances[names[0]] - sum(balances.values()), 2)
+    return balances
+
+
+class TestSharedMemoryParallel:
+    def test_matches_serial_solves(self):
+        """Test that worker plans equal in-process plans, in input order"""
+        topo, names = random_topology(40, 40, seed=1)
+        rng = random.Random(2)
+        vectors = [random_balances(names, rng) for _ in range(12)]
+
+        plans = list(parallel_settle(topo, vectors, max_workers=2, chunksize=3))
+
+        assert plans == [topo.settle(b) for b in vectors]
+
+    def test_weighted_objective(self):
+        """Test that cost vectors are shared and folded in the workers"""
+        topo, names = random_topology(
+            20, 20, seed=3, objective=("hops", "fee"), channel_costs={"venmo": {"fee": 2}}
+        )
+        rng = random.Random(4)
+        vectors = [random_balances(names, rng) for _ in range(4)]
+
+        plans = list(parallel_settle(topo, vectors, max_workers=2))
+
+        assert plans == [topo.settle(b) for b in vectors]
+
+    def test_input_is_consumed_lazily(self):
+        """Test that an endless input stream is read only a window ahead"""
+        topo, names = random_topology(10, 5, seed=8)
+        rng = random.Random(9)
+        consumed = 0
+
+        def endless():
+            nonlocal consumed
+            while True:
+                consumed += 1
+                yield random_balances(names, rng)
+
+        results = parallel_solve(topo, endless(), max_workers=2, chunksize=2)
+        first = list(islice(results, 5))
+        results.close()
+
+        assert len(first) == 5
+        # 2ワーカー x 2チャンク x 2件 + 取り出した分のチャンク
+        assert consumed <= 5 + 2 * 2 * 2 + 2
+
+    def test_results_report_optimality(self):
+        """Test that the anytime gap and optimal flag reach the caller"""
+        topo, names = random_topology(20, 20, seed=10)
+        rng = random.Random(11)
+        vectors = [random_balances(names, rng) for _ in range(4)]
+
+        results = list(parallel_solve(topo, vectors, max_workers=2))
+
+        assert all(r.optimal and r.gap == 0.0 for r in results)
+        assert [r.cost for r in results] == [topo.solve(b).cost for b in vectors]
+
+    def test_segments_hold_arrays_and_are_freed(self):
+        """Test the shared layout and that close() unlinks the segments"""
+        topo, _ = random_topology(10, 5, seed=5)
+        with SharedTopology(topo) as shared:
+            tails = shared.segments[0].buf[: 8 * len(topo.tails)].cast("q")
+            assert list(tails) == list(topo.tails)
+            tails.release()
+            assert shared.spec["vectors"] is None
+        assert shared.segments == []
+
+    def test_delta_is_sparse(self):
+        """Test that only non-zero balances cross the process boundary"""
+        topo, names = random_topology(10, 5, seed=6)
+        ids, amounts = _delta(topo, {names[0]: -5.0, names[1]: 0.0, names[2]: 5.0})
+
+        assert list(ids) == [topo.ids[names[0]], topo.ids[names[2]]]
+        assert list(amounts) == [-5.0, 5.0]
@@ -0,0 +1,47 @@
+import copy
+import json
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/")))
+from tricount_read import get_net_by_member, get_net_from_tricount
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "sample_registry.json")
+
+
+def load_sample():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestNetBalances:
+    def test_net_by_member(self):
+        """Test id-keyed balances and the display-name table"""
+        net, names = get_net_by_member(SAMPLE)
+
+        assert net == {1: -10.0, 2: 130.0, 3: -120.0, 4: 0.0}
+        assert names == {1: "Matt", 2: "Hibiki", 3: "Gowtham", 4: "Guillermo"}
+
+    def test_net_by_name(self):
+        """Test the display-name keyed balances"""
+        net = get_net_from_tricount(load_sample())
+
+        assert net == {"Matt": -10.0, "Hibiki": 130.0, "Gowtham": -120.0, "Guillermo": 0.0}
+
+    def test_shared_display_name_stays_separate(self):
+        """Test that two members with the same display name keep their own balance"""
+        data = load_sample()
+        reg = data["Response"][0]["Registry"]
+        twin = copy.deepcopy(reg["memberships"][0])
+        twin["RegistryMembershipNonUser"]["id"] = 5
+        reg["memberships"].append(twin)
+        # the second "Matt" takes over Guillermo's share of the gas
+        alloc = reg["all_registry_entry"][2]["RegistryEntry"]["allocations"][2]
+        alloc["membership"] = copy.deepcopy(twin)
+
+        net, names = get_net_by_member(data)
+
+        assert names[1] == names[5] == "Matt"
+        assert net[1] == -10.0
+        assert net[5] == -30.0
+        assert net[4] == 30.0